@@ -0,0 +1,167 @@
+"""Агрегаты для аналитики тренировок.
+
+Таблицы считаются векторно один раз при полной загрузке данных, а затем
+дополняются только по новым строкам: группируются только новые строки,
+значения по уже известным ключам обновляются по позициям, а новые ключи
+дописываются в конец. Индексы таблиц не сортируются: выборка среза идет
+по кодам уровней индекса, как фильтр среза в compact.slice_mask.
+"""
+import numpy as np
+import pandas as pd
+
+import compact
+
+SLICE = ["user_id", "muscle_group", "exercise"]
+
+
+def estimated_1rm(weight, reps, formula="epley"):
+    """Расчетный максимум на одно повторение по формуле Эпли или Бжицки."""
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    if formula == "epley":
+        e1rm = weight * (1 + reps / 30)
+    elif formula == "brzycki":
+        # Формула Бжицки применима только до 36 повторений
+        e1rm = weight * 36 / (37 - np.minimum(reps, 36))
+    else:
+        raise ValueError(f"Неизвестная формула: {formula}")
+    # Одно повторение — это и есть максимум, без повторений максимума нет
+    return np.where(reps == 1, weight, np.where(reps > 0, e1rm, 0.0))
+
+
+def epley_1rm(weight, reps):
+    """Расчетный 1ПМ одного подхода по формуле Эпли, как estimated_1rm, но без numpy."""
+    if reps <= 0:
+        return 0.0
+    return float(weight) if reps == 1 else weight * (1 + reps / 30)
+
+
+def _week(dates):
+    return dates.dt.to_period("W-SUN").dt.start_time
+
+
+def _merge(table, new, combine):
+    """Таблица table, дополненная агрегатами new той же структуры.
+
+    combine задает для колонок, как объединить значения по ключам, которые
+    уже есть в table (np.add, np.maximum). Сама table не меняется.
+    """
+    if table.empty:
+        return new
+    positions = table.index.get_indexer(new.index)
+    existing = positions >= 0
+    # Копия значений без перестроения индекса: кэш поиска по индексу сохраняется
+    result = table.copy()
+    if existing.any():
+        rows = positions[existing]
+        for column, func in combine.items():
+            j = result.columns.get_loc(column)
+            result.iloc[rows, j] = func(result.iloc[rows, j].to_numpy(), new[column].to_numpy()[existing])
+    if not existing.all():
+        result = pd.concat([result, new[~existing]])
+    return result
+
+
+def _select(table, keys):
+    """Строки таблицы с первыми уровнями индекса keys, по возрастанию следующего уровня."""
+    index = table.index
+    mask = np.ones(len(table), dtype=bool)
+    for level, key in enumerate(keys):
+        code = index.levels[level].get_indexer([key])[0]
+        mask &= index.codes[level] == code if code >= 0 else False
+    result = table[mask].reset_index(level=list(range(len(keys))), drop=True)
+    return result.sort_index(kind="stable")
+
+
+class TrainingAnalytics:
+    """Агрегаты по тренировкам.
+
+    sessions — по (пользователь, группа, упражнение, дата): тоннаж, рабочий вес, 1ПМ;
+    weekly   — по (пользователь, группа, неделя): недельный объем;
+    records  — подходы, которыми был побит расчетный 1ПМ в упражнении;
+    best     — текущий лучший расчетный 1ПМ в каждом упражнении.
+
+    Объект не изменяется: update возвращает новый.
+    """
+
+    def __init__(self, sessions, weekly, records, best):
+        self.sessions = sessions
+        self.weekly = weekly
+        self.records = records
+        self.best = best
+
+    @classmethod
+    def empty(cls):
+        sessions = pd.DataFrame(
+            columns=["tonnage", "top_weight", "e1rm", "sets"],
+            index=pd.MultiIndex.from_arrays([[], [], [], pd.DatetimeIndex([])], names=SLICE + ["date"]),
+            dtype=np.float64,
+        )
+        weekly = pd.DataFrame(
+            columns=["volume"],
+            index=pd.MultiIndex.from_arrays([[], [], pd.DatetimeIndex([])], names=["user_id", "muscle_group", "week"]),
+            dtype=np.float64,
+        )
+        records = pd.DataFrame(columns=SLICE + ["date", "weight", "reps", "e1rm"])
+        best = pd.Series(index=pd.MultiIndex.from_arrays([[], [], []], names=SLICE), dtype=np.float64)
+        return cls(sessions, weekly, records, best)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Считает все агрегаты по подготовленному DataFrame, отсортированному по дате."""
+        return cls.empty().update(df)
+
+    def update(self, new_rows):
+        """Агрегаты с учетом новых строк (колонки date, weight, max_reps, volume, sets)."""
+        if new_rows.empty:
+            return self
+        rows = new_rows[SLICE + ["date", "weight", "reps", "max_reps", "volume", "sets"]].copy()
+        # Дашборд хранит даты номерами дней, а вес во float32 (см. compact)
+        if pd.api.types.is_integer_dtype(rows["date"]):
+            rows["date"] = compact.from_days(rows["date"])
+        rows["weight"] = compact.from_weight(rows["weight"])
+        rows["e1rm"] = estimated_1rm(rows["weight"], rows["max_reps"])
+        for column in SLICE:
+            rows[column] = rows[column].astype(str)
+
+        # Тоннаж и максимумы за тренировку
+        sessions = rows.groupby(SLICE + ["date"], sort=False).agg(
+            tonnage=("volume", "sum"), top_weight=("weight", "max"),
+            e1rm=("e1rm", "max"), sets=("sets", "sum"),
+        ).astype(np.float64)
+        sessions = _merge(self.sessions, sessions, {"tonnage": np.add, "top_weight": np.maximum,
+                                                    "e1rm": np.maximum, "sets": np.add})
+
+        # Недельный объем по группе мышц
+        rows["week"] = _week(rows["date"])
+        weekly = rows.groupby(["user_id", "muscle_group", "week"], sort=False)[["volume"]].sum().astype(np.float64)
+        weekly = _merge(self.weekly, weekly, {"volume": np.add})
+
+        # Рекорды: подход лучше всех предыдущих в этом упражнении
+        keys = pd.MultiIndex.from_frame(rows[SLICE])
+        previous_best = self.best.reindex(keys).fillna(-np.inf).to_numpy()
+        grouped = rows.groupby(SLICE, sort=False)["e1rm"]
+        prior = grouped.cummax().groupby([rows[column] for column in SLICE], sort=False).shift(1)
+        prior = np.maximum(prior.fillna(-np.inf).to_numpy(), previous_best)
+        is_record = (rows["e1rm"].to_numpy() > prior) & (rows["e1rm"].to_numpy() > 0)
+        new_records = rows.loc[is_record, SLICE + ["date", "weight", "reps", "e1rm"]]
+        records = self.records
+        if len(new_records):
+            records = pd.concat([records, new_records] if len(records) else [new_records], ignore_index=True)
+
+        best = _merge(self.best.to_frame("e1rm"), grouped.max().to_frame("e1rm"), {"e1rm": np.maximum})["e1rm"]
+        return TrainingAnalytics(sessions, weekly, records, best)
+
+    def session_stats(self, user, muscle_group, exercise):
+        """Тоннаж, рабочий вес и расчетный 1ПМ по тренировкам в упражнении."""
+        return _select(self.sessions, (user, muscle_group, exercise)).reset_index()
+
+    def weekly_volume(self, user, muscle_group):
+        """Недельный объем по группе мышц."""
+        return _select(self.weekly, (user, muscle_group)).reset_index()
+
+    def personal_records(self, user, muscle_group, exercise):
+        """Хронология рекордов расчетного 1ПМ в упражнении."""
+        mask = ((self.records["user_id"] == user) & (self.records["muscle_group"] == muscle_group)
+                & (self.records["exercise"] == exercise))
+        return self.records[mask].sort_values("date", kind="stable")
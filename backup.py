@@ -0,0 +1,319 @@
+"""Резервные копии данных в отдельную ветку git.
+
+Файлы хранилища и имена пользователей сохраняются в собственный bare-репозиторий
+(backup.git) и отправляются в удаленный репозиторий. Объекты git пишутся
+напрямую по хэшу содержимого: неизменившиеся файлы и части файлов не
+записываются и не отправляются повторно, а если не изменилось ничего,
+коммит не создается. Большие файлы режутся на части по границам строк,
+выбранным по содержимому, поэтому дописанный журнал или основной файл
+после компакции меняют только последние части.
+
+Данные читаются без блокировок: бот продолжает писать во время копирования.
+Журналы только дописываются, и недописанная строка в конце отбрасывается;
+SQLite копируется через backup API. Если основной файл подменили во время
+чтения (компакция), чтение повторяется.
+
+Запуск вручную и восстановление:
+    python backup.py --remote /path/to/backup-remote.git
+    python backup.py restore /path/to/directory
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import subprocess
+import time
+import zlib
+
+import storage
+
+logger = logging.getLogger(__name__)
+
+BACKUP_GIT_DIR = "backup.git"
+BACKUP_BRANCH = "gym-data"
+USER_NAMES_FILE = "user_names.json"
+# Файлы больше CHUNK_SIZE хранятся частями в каталоге <файл>.chunks
+CHUNK_SIZE = 1 << 20
+CHUNK_SUFFIX = ".chunks"
+# В среднем одна граница частей на CHUNK_LINES строк текста
+CHUNK_LINES = 8192
+READ_ATTEMPTS = 3
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+JOURNAL_HEADER = b"#base;"
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _read_sqlite(path):
+    """Согласованная копия базы вместе с WAL."""
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    target = sqlite3.connect(":memory:")
+    try:
+        source.backup(target)
+        return target.serialize()
+    finally:
+        source.close()
+        target.close()
+
+
+def read_file(path):
+    """Содержимое файла для копии; журнал — без недописанной строки."""
+    with open(path, "rb") as f:
+        head = f.read(len(SQLITE_HEADER))
+        if head == SQLITE_HEADER:
+            return _read_sqlite(path)
+        data = head + f.read()
+    if data.startswith(JOURNAL_HEADER):
+        data = data[:data.rfind(b"\n") + 1]
+    return data
+
+
+def split_chunks(data):
+    """Части файла: текст режется после строк с подходящим хэшем, остальное — поровну."""
+    if len(data) <= CHUNK_SIZE:
+        return [data]
+    if data.startswith(SQLITE_HEADER):
+        return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+    chunks = []
+    start = 0
+    position = 0
+    while position < len(data):
+        end = data.find(b"\n", position)
+        end = len(data) if end < 0 else end + 1
+        # Граница зависит только от строки, поэтому вставка или удаление
+        # строки сдвигает не больше одной части
+        if zlib.crc32(data[position:end]) % CHUNK_LINES == 0 or end - start >= 4 * CHUNK_SIZE:
+            chunks.append(data[start:end])
+            start = end
+        position = end
+    if start < len(data):
+        chunks.append(data[start:])
+    return chunks
+
+
+class GitObjects:
+    """Запись объектов git в bare-репозиторий без вызова git на каждый объект."""
+
+    def __init__(self, git_dir):
+        self.git_dir = git_dir
+
+    def git(self, *args, input=None):
+        result = subprocess.run(["git", "--git-dir", self.git_dir, *args], input=input,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        if result.returncode != 0:
+            raise RuntimeError(f"git {args[0]}: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result.stdout
+
+    def init(self):
+        if not os.path.isdir(self.git_dir):
+            subprocess.run(["git", "init", "--quiet", "--bare", self.git_dir], check=True)
+
+    def write(self, kind, data):
+        """Сохраняет объект и возвращает его хэш; существующий объект не перезаписывается."""
+        raw = kind.encode("ascii") + b" " + str(len(data)).encode("ascii") + b"\x00" + data
+        sha = hashlib.sha1(raw).hexdigest()
+        path = os.path.join(self.git_dir, "objects", sha[:2], sha[2:])
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(raw, 1))
+            os.replace(tmp, path)
+        return sha
+
+    def write_tree(self, entries):
+        """Дерево из {путь: хэш файла}; вложенные каталоги создаются по путям."""
+        children = {}
+        for path, sha in entries.items():
+            name, _, rest = path.partition("/")
+            if rest:
+                children.setdefault(name, {})[rest] = sha
+            else:
+                children[name] = sha
+        items = []
+        for name, value in children.items():
+            if isinstance(value, dict):
+                items.append((name.encode("utf-8") + b"/", b"40000", name, self.write_tree(value)))
+            else:
+                items.append((name.encode("utf-8"), b"100644", name, value))
+        # git сортирует каталоги так, будто их имя оканчивается на "/"
+        items.sort(key=lambda item: item[0])
+        data = b"".join(mode + b" " + name.encode("utf-8") + b"\x00" + bytes.fromhex(sha)
+                        for _, mode, name, sha in items)
+        return self.write("tree", data)
+
+    def resolve(self, ref):
+        """Хэш объекта по ссылке или None."""
+        try:
+            return self.git("rev-parse", "--verify", "--quiet", ref).decode("ascii").strip()
+        except RuntimeError:
+            return None
+
+
+class Backup:
+    """Резервное копирование файлов files() в ветку branch и отправка в remote."""
+
+    def __init__(self, files, remote=None, git_dir=BACKUP_GIT_DIR, branch=BACKUP_BRANCH):
+        self.files = files
+        self.remote = remote
+        self.branch = branch
+        self.objects = GitObjects(git_dir)
+        # путь -> (отпечаток файла, {путь в дереве: хэш части}, время изменения или None)
+        self._cache = {}
+        self._head = None
+        self._pushed = None
+        self._started = False
+
+    @property
+    def ref(self):
+        return f"refs/heads/{self.branch}"
+
+    def _start(self):
+        self.objects.init()
+        if self.remote and self.objects.resolve(self.ref) is None:
+            # Продолжаем историю из удаленного репозитория, если она там уже есть
+            try:
+                self.objects.git("fetch", "--quiet", self.remote, f"+{self.ref}:{self.ref}")
+                self._pushed = self.objects.resolve(self.ref)
+            except RuntimeError as e:
+                logger.info(f"Ветка {self.branch} в {self.remote} не найдена: {e}")
+        self._head = self.objects.resolve(self.ref)
+        self._started = True
+
+    def _file_stamp(self, path):
+        # Изменения SQLite сначала попадают в WAL и не меняют сам файл
+        stamps = [_stat_key(path)]
+        if os.path.exists(path + "-wal"):
+            stamps.append(_stat_key(path + "-wal"))
+        return tuple(stamps)
+
+    def _store(self, path, data):
+        """Записывает части файла и возвращает {путь в дереве: хэш}."""
+        name = path.replace(os.sep, "/")
+        chunks = split_chunks(data)
+        if len(chunks) == 1:
+            return {name: self.objects.write("blob", data)}
+        return {f"{name}{CHUNK_SUFFIX}/{i:06d}": self.objects.write("blob", chunk)
+                for i, chunk in enumerate(chunks)}
+
+    def _snapshot_file(self, path):
+        """(отпечаток, части) для файла; неизменившийся файл не читается."""
+        stamp = self._file_stamp(path)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached
+        for _ in range(READ_ATTEMPTS):
+            data = read_file(path)
+            new_stamp = self._file_stamp(path)
+            journal = data.startswith(JOURNAL_HEADER)
+            # Журнал дописывается во время чтения — это нормально, важна только
+            # подмена файла; копия SQLite согласована сама по себе
+            if (new_stamp == stamp or data.startswith(SQLITE_HEADER)
+                    or (journal and new_stamp[0][0] == stamp[0][0])):
+                break
+            stamp = new_stamp
+        else:
+            raise RuntimeError(f"{path} постоянно меняется во время чтения")
+        entry = (stamp, self._store(path, data))
+        self._cache[path] = entry
+        return entry
+
+    def _snapshot(self):
+        """{путь в дереве: хэш} для всех существующих файлов."""
+        entries, seen = {}, set()
+        for path in self.files():
+            try:
+                _, parts = self._snapshot_file(path)
+            except FileNotFoundError:
+                continue
+            seen.add(path)
+            entries.update(parts)
+        for path in set(self._cache) - seen:
+            del self._cache[path]
+        return entries
+
+    def _commit(self, tree, message):
+        now = int(time.time())
+        name = os.environ.get("GIT_AUTHOR_NAME", "gym-backup")
+        email = os.environ.get("GIT_AUTHOR_EMAIL", "gym-backup@localhost")
+        lines = [f"tree {tree}"]
+        if self._head:
+            lines.append(f"parent {self._head}")
+        lines.append(f"author {name} <{email}> {now} +0000")
+        lines.append(f"committer {name} <{email}> {now} +0000")
+        data = ("\n".join(lines) + "\n\n" + message + "\n").encode("utf-8")
+        commit = self.objects.write("commit", data)
+        self.objects.git("update-ref", self.ref, commit, *([self._head] if self._head else []))
+        self._head = commit
+        return commit
+
+    def run(self):
+        """Сохраняет изменения и отправляет их; возвращает хэш нового коммита или None."""
+        if not self._started:
+            self._start()
+        tree = self.objects.write_tree(self._snapshot())
+        commit = None
+        if self._head is None or self.objects.resolve(f"{self._head}^{{tree}}") != tree:
+            commit = self._commit(tree, f"GYM BACKUP {time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+            logger.info(f"Резервная копия {commit[:12]} сохранена")
+        if self.remote and self._head is not None and self._head != self._pushed:
+            self.objects.git("push", "--quiet", self.remote, f"{self.ref}:{self.ref}")
+            self._pushed = self._head
+            logger.info(f"Резервная копия отправлена в {self.remote}")
+        return commit
+
+
+def restore(directory, git_dir=BACKUP_GIT_DIR, branch=BACKUP_BRANCH, remote=None):
+    """Восстанавливает файлы из последней резервной копии в directory."""
+    objects = GitObjects(git_dir)
+    ref = f"refs/heads/{branch}"
+    if remote:
+        objects.init()
+        objects.git("fetch", "--quiet", remote, f"+{ref}:{ref}")
+    files = {}
+    listing = objects.git("ls-tree", "-r", "-z", ref).decode("utf-8").split("\x00")
+    for item in filter(None, listing):
+        info, path = item.split("\t", 1)
+        sha = info.split()[2]
+        head, sep, part = path.rpartition(CHUNK_SUFFIX + "/")
+        name = head if sep else path
+        files.setdefault(name, []).append((part, sha))
+    for name, parts in sorted(files.items()):
+        data = b"".join(objects.git("cat-file", "blob", sha) for _, sha in sorted(parts))
+        target = os.path.join(directory, *name.split("/"))
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+    logger.info(f"Восстановлено файлов: {len(files)} в {directory}")
+
+
+def data_files():
+    """Файлы текущего хранилища (GYM_STORAGE) и имена пользователей."""
+    return storage.get_storage().backup_files() + [USER_NAMES_FILE]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Резервные копии данных в git")
+    parser.add_argument("--remote", default=os.environ.get("GYM_BACKUP_REMOTE"),
+                        help="удаленный репозиторий (по умолчанию GYM_BACKUP_REMOTE)")
+    parser.add_argument("--git-dir", default=BACKUP_GIT_DIR)
+    parser.add_argument("--branch", default=BACKUP_BRANCH)
+    subparsers = parser.add_subparsers(dest="command")
+    restore_parser = subparsers.add_parser("restore", help="восстановить последнюю копию")
+    restore_parser.add_argument("directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    if args.command == "restore":
+        restore(args.directory, args.git_dir, args.branch, args.remote)
+    else:
+        Backup(data_files, args.remote, args.git_dir, args.branch).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Импорт большой выгрузки: время и пиковая память процесса.
+
+Во временном каталоге генерируется выгрузка из --rows строк (русские
+заголовки, разделитель ',', часть пользователей — по Telegram id, несколько
+заведомо некорректных строк), после чего bulk_import.py запускается
+отдельным процессом для каждого хранилища. Пиковая память (VmHWM, Linux)
+не должна расти вместе с размером файла.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bulk_import --rows 1500000 --storages csv sqlite sharded
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_export(directory, rows):
+    """Пишет export.csv и user_names.json; возвращает путь к выгрузке."""
+    from benchmarks import synth
+    df = synth.generate(rows)
+    user_names = synth.user_names_for(df)
+    with open(os.path.join(directory, "user_names.json"), "w") as f:
+        json.dump(user_names, f, ensure_ascii=False)
+    ids = {name: user_id for user_id, name in user_names.items()}
+    df["user_id"] = [ids[name] if i % 2 else name for i, name in enumerate(df["user_id"])]
+    df["weight"] = df["weight"].astype(object)
+    # Поддерживаемые форматы и строки, которые должны быть отклонены
+    df.loc[1, "date"] = "31.12.2024"
+    df.loc[2, "weight"] = "52,5"
+    df.loc[3, "date"] = "вчера"
+    df.loc[4, "weight"] = "abc"
+    df.loc[5, "reps"] = "много"
+    df.loc[7, "reps"] = "9 8"
+    df.loc[8, "reps"] = "(12 10)"
+    df.loc[6, "user_id"] = "Незнакомец"
+    df.columns = ["Пользователь", "Дата", "Группа мышц", "Упражнение", "Вес", "Повторения"]
+    path = os.path.join(directory, "export.csv")
+    df.to_csv(path, sep=',', index=False)
+    return path
+
+
+# Форматы повторений в выгрузках и ожидаемый результат reps.normalize (None — строка отклоняется)
+REPS_CASES = {
+    "9": "(9,)",
+    "9 8": "(9, 8)",
+    "(12 10)": "(12, 10)",
+    "12, 10": "(12, 10)",
+    "[12, 10, 8]": "(12, 10, 8)",
+    "12,,10": None,
+    "много": None,
+}
+
+
+def check_reps():
+    """Проверяет разбор повторений до замера."""
+    import reps
+    normalized, valid = reps.normalize(list(REPS_CASES))
+    for (value, expected), result, ok in zip(REPS_CASES.items(), normalized, valid):
+        assert (result if ok else None) == expected, f"{value!r}: {result!r}, ожидалось {expected!r}"
+
+
+def run_import(directory, path, storage_name):
+    """(секунды, пиковая память в МБ, вывод) для импорта в чистое хранилище."""
+    # VmHWM, а не ru_maxrss: ru_maxrss переживает exec и включал бы память этого процесса
+    code = ("import runpy, sys; sys.argv = sys.argv[1:]; "
+            "runpy.run_path(sys.argv[0], run_name='__main__'); "
+            "print('maxrss', next(line.split()[1] for line in open('/proc/self/status') "
+            "if line.startswith('VmHWM')), file=sys.stderr)")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code, os.path.join(REPO_ROOT, "bulk_import.py"),
+                             path, "--storage", storage_name],
+                            cwd=directory, env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Импорт в {storage_name} завершился ошибкой:\n{result.stderr[-2000:]}")
+    lines = result.stderr.splitlines()
+    maxrss = next(int(line.split()[1]) for line in lines if line.startswith("maxrss"))
+    return seconds, maxrss / 1024, [line for line in lines if not line.startswith("maxrss")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_500_000)
+    parser.add_argument("--storages", nargs="+", default=["csv", "sqlite", "sharded"])
+    parser.add_argument("--output", help="JSON с результатами")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    check_reps()
+    results = {"rows": args.rows}
+    with tempfile.TemporaryDirectory(prefix="gym-import-") as directory:
+        path = write_export(directory, args.rows)
+        results["file_mb"] = os.path.getsize(path) / 2**20
+        print(f"Выгрузка: {args.rows} строк, {results['file_mb']:.0f} МБ")
+        for storage_name in args.storages:
+            workdir = os.path.join(directory, storage_name)
+            os.makedirs(workdir)
+            shutil.copy(os.path.join(directory, "user_names.json"), workdir)
+            seconds, peak_mb, log = run_import(workdir, path, storage_name)
+            results[storage_name] = {"seconds": seconds, "peak_rss_mb": peak_mb}
+            print(f"{storage_name}: {seconds:.1f} с, пиковая память {peak_mb:.0f} МБ")
+            for line in log[-3:]:
+                print(f"    {line}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Пачка одновременных диалогов через бота с локальной заменой Telegram API.
+
+Каждый пользователь проходит полный диалог записи подхода (/start, группа,
+упражнение, вес, повторения); все обновления ставятся в очередь разом.
+Telegram API заменяет локальный HTTP-сервер с искусственной задержкой
+ответа. Сравниваются последовательная обработка и PerUserUpdateProcessor;
+все подходы должны сохраниться в обоих режимах.
+
+Запуск из корня репозитория:
+    python -m benchmarks.burst --users 50 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "123456:BENCH"
+DIALOG = ["/start", "Грудь", "Жим лежа", "80", "10 8 6"]
+
+
+class FakeTelegram(ThreadingHTTPServer):
+    """Отвечает на методы Bot API, которые вызывает бот, и считает ответы пользователям."""
+
+    daemon_threads = True
+    # Бот открывает до CONCURRENT_UPDATES соединений одновременно
+    request_queue_size = 256
+
+    def __init__(self, latency):
+        super().__init__(("127.0.0.1", 0), FakeTelegramHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.messages = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/bot"
+
+    def sent(self):
+        with self.lock:
+            return sum(len(texts) for texts in self.messages.values())
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(body or "{}")
+        return {key: values[0] for key, values in parse_qs(body).items()}
+
+    def do_POST(self):
+        method = self.path.rsplit("/", 1)[-1]
+        params = self._params()
+        time.sleep(self.server.latency)
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        elif method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            with self.server.lock:
+                self.server.messages.setdefault(chat_id, []).append(params.get("text", ""))
+            result = {"message_id": 1, "date": 0, "chat": {"id": chat_id, "type": "private"},
+                      "text": params.get("text", "")}
+        else:
+            result = True
+        data = json.dumps({"ok": True, "result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_update(update_id, user_id, text):
+    message = {
+        "message_id": update_id, "date": int(time.time()), "text": text,
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": str(user_id)},
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return {"update_id": update_id, "message": message}
+
+
+async def run_burst(main, telegram, user_ids, concurrent_updates):
+    from telegram import Update
+
+    application = main.build_application(TOKEN, concurrent_updates, base_url=telegram.base_url)
+
+    saved_before = sum(len(sets) for sets in main.index.history.values())
+    with telegram.lock:
+        telegram.messages.clear()
+    await application.initialize()
+    main.writer.start()
+    await application.start()
+
+    expected = len(user_ids) * len(DIALOG)
+    start = time.perf_counter()
+    update_id = 0
+    # Все пользователи пишут одновременно; сообщения одного пользователя идут по порядку
+    for step in DIALOG:
+        for user_id in user_ids:
+            update_id += 1
+            await application.update_queue.put(Update.de_json(make_update(update_id, user_id, step), application.bot))
+    while telegram.sent() < expected and time.perf_counter() - start < 60:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    await application.stop()
+    await application.shutdown()
+    await main.writer.stop()
+    saved = sum(len(sets) for sets in main.index.history.values()) - saved_before
+    return {
+        "seconds": elapsed,
+        "updates_per_second": expected / elapsed,
+        "replies": telegram.sent(),
+        "expected_replies": expected,
+        "saved_sets": saved,
+        "expected_sets": len(user_ids),
+    }
+
+
+async def run_modes(main, telegram, user_ids):
+    results = {}
+    for mode, concurrent_updates in (("sequential", 1), ("per_user", main.CONCURRENT_UPDATES)):
+        result = await run_burst(main, telegram, user_ids, concurrent_updates)
+        results[mode] = result
+        print(f"{mode}: {result['seconds']:.2f} с, {result['updates_per_second']:.0f} обновлений/с, "
+              f"ответов {result['replies']} из {result['expected_replies']}, "
+              f"сохранено подходов {result['saved_sets']} из {result['expected_sets']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=10_000, help="строк истории для загрузки ботом")
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа Telegram API, с")
+    parser.add_argument("--output", help="JSON с результатами")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks import synth
+
+    with tempfile.TemporaryDirectory(prefix="gym-burst-") as directory:
+        df = synth.write_dataset(directory, args.rows)
+        os.chdir(directory)
+        import main as bot
+        # Каждый запрос к локальному API иначе попадает в лог
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        # Пользователи с уже заданными именами, чтобы диалог сразу шел к записи подхода
+        user_ids = [200000 + i for i in range(args.users)]
+        for user_id in user_ids:
+            bot.user_names[str(user_id)] = f"Участник {user_id}"
+
+        telegram = FakeTelegram(args.latency)
+        threading.Thread(target=telegram.serve_forever, daemon=True).start()
+        # Очередь фонового писателя привязана к одному циклу событий
+        results = asyncio.run(run_modes(bot, telegram, user_ids))
+        telegram.shutdown()
+        del df
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"users": args.users, "latency": args.latency, "results": results}, f, indent=2)
+
+    # Потерянные подходы или ответы — ошибка, а не просто медленный прогон
+    failed = [mode for mode, result in results.items()
+              if result["saved_sets"] != result["expected_sets"] or result["replies"] != result["expected_replies"]]
+    if failed:
+        print(f"Не все подходы сохранены или не на все сообщения есть ответ: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
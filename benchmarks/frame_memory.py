@@ -0,0 +1,113 @@
+"""Память и скорость фильтров DataFrame дашборда: строки против категорий.
+
+«До» — колонки в том виде, в каком их держал дашборд раньше: строки object,
+вес float64, дата datetime64[ns], статистика подходов int64. «После» —
+результат dashboard.prepare_data (см. compact). Для обоих вариантов
+выводится память по колонкам (memory_usage(deep=True)) и медианное время
+выборки одного среза (пользователь, группа, упражнение).
+
+Запуск из корня репозитория:
+    python -m benchmarks.frame_memory --rows 1000000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_frame(df):
+    """Подготовленный DataFrame с прежними типами колонок."""
+    import compact
+    import numpy as np
+    columns = {column: df[column].astype(str).astype(object) for column in compact.CATEGORICAL}
+    return df.assign(
+        **columns,
+        date=compact.from_days(df["date"]),
+        weight=compact.from_weight(df["weight"]),
+        max_reps=df["max_reps"].astype(np.int64),
+        total_reps=df["total_reps"].astype(np.int64),
+        sets=df["sets"].astype(np.int64),
+    )
+
+
+def string_filter(df, user, muscle_group, exercise):
+    return df[(df["user_id"] == user) & (df["muscle_group"] == muscle_group) & (df["exercise"] == exercise)]
+
+
+def code_filter(df, user, muscle_group, exercise):
+    import compact
+    return df[compact.slice_mask(df, user, muscle_group, exercise)]
+
+
+def median_seconds(func, df, slices, repeat):
+    timings = []
+    for _ in range(repeat):
+        for key in slices:
+            start = time.perf_counter()
+            func(df, *key)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def memory(df):
+    usage = df.memory_usage(index=False, deep=True)
+    return {column: int(usage[column]) for column in df.columns}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--slices", type=int, default=20, help="случайных срезов для замера фильтра")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON с результатами")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks import synth
+
+    raw = synth.generate(args.rows)
+    # dashboard при импорте загружает данные из текущего каталога, здесь он пуст
+    with tempfile.TemporaryDirectory(prefix="gym-frame-") as directory:
+        os.chdir(directory)
+        import dashboard
+        start = time.perf_counter()
+        after = dashboard.prepare_data(raw.copy())
+        prepare_seconds = time.perf_counter() - start
+    before = legacy_frame(after)
+
+    slices = list(after[["user_id", "muscle_group", "exercise"]].drop_duplicates()
+                  .sample(min(args.slices, len(after)), random_state=0).astype(str).itertuples(index=False))
+    # Выборки должны совпадать
+    for key in slices[:3]:
+        assert len(string_filter(before, *key)) == len(code_filter(after, *key))
+
+    results = {"rows": args.rows, "prepare_seconds": prepare_seconds}
+    for name, df, func in (("before", before, string_filter), ("after", after, code_filter)):
+        results[name] = {
+            "memory_bytes": memory(df),
+            "memory_total_bytes": int(df.memory_usage(index=False, deep=True).sum()),
+            "filter_seconds": median_seconds(func, df, slices, args.repeat),
+        }
+
+    print(f"Строк: {args.rows}, prepare_data: {prepare_seconds:.2f} с")
+    print(f"{'колонка':<14}{'до, МБ':>10}{'после, МБ':>12}")
+    for column in after.columns:
+        print(f"{column:<14}{results['before']['memory_bytes'][column] / 2**20:>10.1f}"
+              f"{results['after']['memory_bytes'][column] / 2**20:>12.1f}")
+    print(f"{'всего':<14}{results['before']['memory_total_bytes'] / 2**20:>10.1f}"
+          f"{results['after']['memory_total_bytes'] / 2**20:>12.1f}")
+    print(f"Фильтр среза: до {results['before']['filter_seconds'] * 1000:.2f} мс, "
+          f"после {results['after']['filter_seconds'] * 1000:.2f} мс")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Сравнение поиска по маскам DataFrame и по WorkoutIndex.
+
+Запуск из корня репозитория:
+    python -m benchmarks.index_lookup --rows 1000000
+"""
+import argparse
+import time
+
+import reps
+from benchmarks import synth
+from workout_index import WorkoutIndex
+
+
+def make_frame(rows, seed=0):
+    """История из synth.generate с повторениями в виде tuple, как в индексе бота."""
+    df = synth.generate(rows, seed=seed)
+    df["reps"] = reps.to_tuples(*reps.parse(df["reps"]))
+    return df
+
+
+def scan_lookup(df, user, muscle, exercise):
+    """Поиск, как он был устроен в main.py до индекса."""
+    user_workouts = df[df["user_id"] == user]
+    user_workouts["muscle_group"].unique().tolist()
+    user_workouts[user_workouts["muscle_group"] == muscle]["exercise"].unique().tolist()
+    last = df[(df["user_id"] == user) & (df["muscle_group"] == muscle) & (df["exercise"] == exercise)]
+    return last.iloc[-1] if not last.empty else None
+
+
+def index_lookup(index, user, muscle, exercise):
+    index.muscle_groups(user)
+    index.exercises(user, muscle)
+    return index.last_set(user, muscle, exercise)
+
+
+def timeit(func, *args, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    start = time.perf_counter()
+    index = WorkoutIndex.from_frame(df)
+    build = time.perf_counter() - start
+
+    key = tuple(df.loc[0, ["user_id", "muscle_group", "exercise"]])
+    scan = timeit(scan_lookup, df, *key, repeat=args.repeat)
+    lookup = timeit(index_lookup, index, *key, repeat=args.repeat)
+    print(f"Строк: {args.rows}")
+    print(f"Построение индекса: {build:.3f} с")
+    print(f"Поиск по DataFrame: {scan * 1e3:.3f} мс")
+    print(f"Поиск по индексу:   {lookup * 1e6:.3f} мкс")
+    print(f"Ускорение: {scan / lookup:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Сравнение векторного разбора reps с разбором через ast.literal_eval.
+
+Запуск из корня репозитория:
+    python -m benchmarks.reps_parser --rows 100000
+"""
+import argparse
+import ast
+import time
+
+import reps
+from benchmarks import synth
+
+
+def make_reps(rows, seed=0):
+    """Колонки reps и weight из synth.generate: голые числа вперемешку со строками tuple."""
+    df = synth.generate(rows, seed=seed)
+    return df["reps"], df["weight"]
+
+
+def literal_eval_path(column, weight):
+    """Разбор, как он был устроен в main.py и dashboard.py."""
+    parsed = column.apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else ())
+    parsed = parsed.apply(lambda x: x if isinstance(x, tuple) else (x,))
+    max_reps = parsed.apply(lambda x: max(x) if len(x) > 0 else 0)
+    total_reps = parsed.apply(sum)
+    sets = parsed.apply(len)
+    return max_reps, total_reps, sets, weight * total_reps
+
+
+def vectorized_path(column, weight):
+    values, offsets = reps.parse(column)
+    return reps.summarize(values, offsets, weight)
+
+
+def best_of(func, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    column, weight = make_reps(args.rows)
+    expected = literal_eval_path(column, weight)
+    result = vectorized_path(column, weight)
+    assert (expected[0].to_numpy() == result["max_reps"]).all()
+    assert (expected[1].to_numpy() == result["total_reps"]).all()
+    assert (expected[2].to_numpy() == result["sets"]).all()
+
+    slow = best_of(literal_eval_path, column, weight, repeat=args.repeat)
+    fast = best_of(vectorized_path, column, weight, repeat=args.repeat)
+    print(f"Строк: {args.rows}")
+    print(f"ast.literal_eval: {slow * 1e3:.1f} мс")
+    print(f"Векторный разбор: {fast * 1e3:.1f} мс")
+    print(f"Ускорение: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
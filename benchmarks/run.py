@@ -0,0 +1,316 @@
+"""Замеры бота и дашборда на синтетических данных.
+
+Для каждого размера генерируется история тренировок во временном каталоге,
+после чего в отдельном процессе (чтобы модули загружались с нуля) замеряются
+загрузка при старте, обработчики бота на поддельных Update без сети,
+сохранение подходов и загрузка/отрисовка в дашборде. Результаты
+пишутся в JSON.
+
+Запуск из корня репозитория:
+    python -m benchmarks.run --sizes 10000 100000 1000000 --output bench_results.json
+    python -m benchmarks.run --sizes 100000 --storage sqlite
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+class FakeMessage:
+    """Сообщение Telegram: только то, что читают обработчики."""
+
+    def __init__(self, user_id, text):
+        self.from_user = SimpleNamespace(id=int(user_id))
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+    async def reply_photo(self, photo, **kwargs):
+        self.replies.append(photo)
+        # Telegram возвращает загруженный файл под новым file_id
+        file_id = photo if isinstance(photo, str) else f"photo-{len(self.replies)}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)])
+
+
+def fake_update(user_id, text):
+    return SimpleNamespace(message=FakeMessage(user_id, text))
+
+
+def fake_context(args=None, **user_data):
+    return SimpleNamespace(user_data=dict(user_data), args=args or [])
+
+
+def timings(samples):
+    """Сводка по замерам в секундах."""
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "min": samples[0],
+        "median": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+def measure(func, *args, repeat=100):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return timings(samples)
+
+
+async def measure_async(func, make_args, repeat=100):
+    samples = []
+    for _ in range(repeat):
+        args = make_args()
+        start = time.perf_counter()
+        await func(*args)
+        samples.append(time.perf_counter() - start)
+    return timings(samples)
+
+
+def pick_slices(index, count):
+    """Первые count срезов (пользователь, группа, упражнение) из индекса."""
+    slices = []
+    for user, muscles in index.users.items():
+        for muscle, exercises in muscles.items():
+            for exercise in exercises:
+                slices.append((user, muscle, exercise))
+                if len(slices) == count:
+                    return slices
+    return slices
+
+
+async def bench_bot(main, repeat):
+    results = {}
+    user_id, user_name = next(iter(main.user_names.items()))
+    # Подходы пользователя попадают в индекс при первом обращении
+    start = time.perf_counter()
+    await main.load_user_index(user_name)
+    results["first_user_access"] = time.perf_counter() - start
+    slices = [s for s in pick_slices(main.index, 50) if s[0] == user_name] or pick_slices(main.index, 1)
+    _, muscle, exercise = slices[0]
+
+    results["get_user_muscle_groups"] = measure(main.get_user_muscle_groups, user_name, repeat=repeat)
+    results["get_user_exercises"] = measure(main.get_user_exercises, user_name, muscle, repeat=repeat)
+    results["select_exercise"] = await measure_async(
+        main.select_exercise,
+        lambda: (fake_update(user_id, exercise), fake_context(muscle_group=muscle)),
+        repeat=repeat,
+    )
+
+    # График /progress: построение в пуле процессов и повторная отправка по file_id
+    main.start_chart_pool()
+    main.chart_pool.submit(int).result()
+    key = (user_name, muscle, exercise)
+    results["progress_render"] = await measure_async(
+        main.progress,
+        # Запись с другой версией — промах кэша, график строится заново
+        lambda: (main.chart_cache.put(key, None, None) or fake_update(user_id, "/progress"),
+                 fake_context(args=[exercise])),
+        repeat=min(repeat, 10),
+    )
+    results["progress_cached"] = await measure_async(
+        main.progress, lambda: (fake_update(user_id, "/progress"), fake_context(args=[exercise])), repeat=repeat,
+    )
+    main.stop_chart_pool()
+
+    # Обработчик только ставит запись в очередь; запись на диск меряется отдельно
+    main.writer.start()
+    results["input_reps"] = await measure_async(
+        main.input_reps,
+        lambda: (fake_update(user_id, "12 10 8"), fake_context(muscle_group=muscle, exercise=exercise, weight=50.0)),
+        repeat=repeat,
+    )
+    start = time.perf_counter()
+    await main.writer.stop()
+    results["input_reps_flush"] = {"records": repeat, "seconds": time.perf_counter() - start}
+
+    record = (main.journal.OP_ADD, {
+        "user_id": user_name, "date": "2026-01-01", "muscle_group": muscle,
+        "exercise": exercise, "weight": 50.0, "reps": (12, 10, 8),
+    })
+    results["storage_write_single"] = measure(main.workouts.write, [record], repeat=min(repeat, 20))
+    results["storage_write_batch_100"] = measure(main.workouts.write, [record] * 100, repeat=min(repeat, 20))
+
+    # Перезапуск: полная загрузка истории против снимка с дочитыванием хвоста
+    if main.columns is not None:
+        results["load_columns_full"] = measure(lambda: main.WorkoutColumns.from_frame(main.workouts.load()), repeat=3)
+        start = time.perf_counter()
+        main.save_snapshot()
+        results["save_snapshot"] = time.perf_counter() - start
+        results["load_columns_snapshot"] = measure(main.load_columns, repeat=3)
+    return results
+
+
+def bench_dashboard(repeat):
+    results = {}
+    start = time.perf_counter()
+    import dashboard
+    import journal
+    results["import"] = time.perf_counter() - start
+
+    empty = dashboard.DataSnapshot(dashboard.pd.DataFrame(columns=dashboard.EMPTY_COLUMNS), 0)
+    results["load_data_full"] = measure(dashboard._reload, empty, repeat=3)
+    data = dashboard.snapshot
+    start = time.perf_counter()
+    dashboard.state_snapshot.save(dashboard.SNAPSHOT_FILE, dashboard.workouts, data.cursor,
+                                  (data.df, data.options, data.analytics))
+    results["save_snapshot"] = time.perf_counter() - start
+    results["load_data_snapshot"] = measure(dashboard._restore, repeat=3)
+    results["load_data_unchanged"] = measure(dashboard.load_data, repeat=repeat)
+
+    # Дописанная ботом строка: перечитывается только хвост журнала
+    user, muscle, exercise = next(
+        (u, m, e) for u, muscles in dashboard.snapshot.options.items()
+        for m, exercises in muscles.items() for e in exercises
+    )
+    record = (journal.OP_ADD, {
+        "user_id": user, "date": "2026-01-01", "muscle_group": muscle,
+        "exercise": exercise, "weight": 50.0, "reps": (12, 10, 8),
+    })
+
+    def append_and_load():
+        dashboard.workouts.write([record])
+        dashboard.refresh_data()
+
+    results["load_data_tail"] = measure(append_and_load, repeat=min(repeat, 20))
+
+    # То же через уведомление бота: записи применяются без чтения хранилища
+    def append_and_apply():
+        before = dashboard.workouts.cursor()
+        dashboard.workouts.write([record])
+        dashboard.apply_event({"before": before, "after": dashboard.workouts.cursor(), "records": [record]})
+
+    results["apply_event"] = measure(append_and_apply, repeat=min(repeat, 20))
+
+    # update_graph при смене фильтров вызывает render_figure
+    def render_cold():
+        dashboard.figure_cache._items.clear()
+        dashboard.render_figure(user, muscle, exercise)
+
+    results["update_graph_cold"] = measure(render_cold, repeat=min(repeat, 20))
+    results["update_graph_cached"] = measure(dashboard.render_figure, user, muscle, exercise, repeat=repeat)
+    results["update_graph_window"] = measure(
+        dashboard.render_figure, user, muscle, exercise, dashboard.DEFAULT_METRIC, ("2024-01-01", "2024-06-30"),
+        repeat=min(repeat, 20),
+    )
+    for metric in ("tonnage", "e1rm", "weekly_volume", "records"):
+        def render_metric(metric=metric):
+            dashboard.figure_cache._items.clear()
+            dashboard.render_figure(user, muscle, exercise, metric)
+        results[f"update_graph_{metric}"] = measure(render_metric, repeat=min(repeat, 10))
+    return results
+
+
+def worker(output, repeat):
+    """Замеры в текущем каталоге с уже сгенерированными данными."""
+    sys.path.insert(0, REPO_ROOT)
+    results = {}
+    # Обработчики и дашборд печатают отладку, в замеры она не попадает
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        import main
+        results["bot_startup"] = time.perf_counter() - start
+        results["bot"] = asyncio.run(bench_bot(main, repeat))
+        results["dashboard"] = bench_dashboard(repeat)
+    with open(output, "w") as f:
+        json.dump(results, f)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(rows, args):
+    from benchmarks import synth
+
+    with tempfile.TemporaryDirectory(prefix="gym-bench-") as directory:
+        start = time.perf_counter()
+        synth.write_dataset(directory, rows, users=args.users, exercises_per_group=args.exercises,
+                            years=args.years, seed=args.seed)
+        generate_seconds = time.perf_counter() - start
+        output = os.path.join(directory, "result.json")
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        if args.storage:
+            env["GYM_STORAGE"] = args.storage
+        storage_name = env.get("GYM_STORAGE", "csv")
+        migrate_seconds = None
+        if storage_name != "csv":
+            # Данные генерируются в workouts.csv и переносятся в выбранное хранилище
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(REPO_ROOT, "storage.py"), "migrate", "csv", storage_name],
+                           cwd=directory, env=env, check=True)
+            migrate_seconds = time.perf_counter() - start
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--worker", output, "--repeat", str(args.repeat)],
+            cwd=directory, env=env, check=True,
+        )
+        with open(output) as f:
+            result = json.load(f)
+    result["rows"] = rows
+    result["generate_seconds"] = generate_seconds
+    if migrate_seconds is not None:
+        result["migrate_seconds"] = migrate_seconds
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="число строк истории, например 10000 100000 1000000 10000000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--exercises", type=int, default=5, help="упражнений на группу мышц")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--storage", choices=["csv", "sqlite", "arrow", "sharded"],
+                        help="хранилище (GYM_STORAGE), по умолчанию csv; данные переносятся в него из csv")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.repeat)
+        return
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage": args.storage or os.environ.get("GYM_STORAGE", "csv"),
+        "results": [],
+    }
+    for rows in args.sizes:
+        print(f"Строк: {rows}...", flush=True)
+        result = run_size(rows, args)
+        report["results"].append(result)
+        print(f"  старт бота: {result['bot_startup']:.2f} с, "
+              f"select_exercise: {result['bot']['select_exercise']['median'] * 1e6:.0f} мкс, "
+              f"полная загрузка дашборда: {result['dashboard']['load_data_full']['median']:.2f} с", flush=True)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Время импорта бота и дашборда по python -X importtime с бюджетом.
+
+Каждая точка входа импортируется в отдельном процессе во временном каталоге
+с небольшой синтетической историей (чтобы мерились в основном импорты, а не
+загрузка данных). Выводится суммарное время импорта модуля, самые тяжелые
+прямые зависимости и модули, которые не должны загружаться при старте.
+Код возврата 1, если бюджет превышен или загружен запрещенный модуль.
+
+Запуск из корня репозитория:
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджет на импорт модуля точки входа, секунды (лучший из повторов)
+BUDGETS = {"main": 1.0, "dashboard": 1.8}
+# Модули, которые должны загружаться только при первом использовании
+DEFERRED = {
+    "main": ["matplotlib", "plotly", "dash"],
+    "dashboard": ["plotly.express", "matplotlib", "telegram"],
+}
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """[(модуль, глубина, собственное время, суммарное время)] в секундах."""
+    modules = []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, total, indent, name = match.groups()
+            modules.append((name, (len(indent) - 1) // 2, int(own) / 1e6, int(total) / 1e6))
+    return modules
+
+
+def import_once(module, directory):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    code = f"import sys; sys.argv = [{module!r}]; import {module}"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=directory, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Импорт {module} завершился ошибкой:\n{result.stderr[-2000:]}")
+    return wall, parse_importtime(result.stderr)
+
+
+def measure(module, directory, repeat):
+    runs = [import_once(module, directory) for _ in range(repeat)]
+    # Первый запуск сохраняет снимки данных; лучший повтор показывает чистые импорты
+    wall, modules = min(runs, key=lambda run: next(total for name, depth, _, total in run[1] if name == module))
+    total = next(total for name, depth, _, total in modules if name == module)
+    own = next(own for name, depth, own, _ in modules if name == module)
+    loaded = {name for name, *_ in modules}
+    dependencies = sorted(((name, total) for name, depth, _, total in modules if depth == 1),
+                          key=lambda item: -item[1])
+    return {
+        "import_seconds": total,
+        "own_seconds": own,
+        "wall_seconds": wall,
+        "wall_seconds_all": [run[0] for run in runs],
+        "top_dependencies": dependencies[:10],
+        "deferred_loaded": [name for name in DEFERRED.get(module, []) if name in loaded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="строк синтетической истории")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-main", type=float, default=BUDGETS["main"])
+    parser.add_argument("--budget-dashboard", type=float, default=BUDGETS["dashboard"])
+    parser.add_argument("--output", help="JSON с результатами")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks import synth
+
+    budgets = {"main": args.budget_main, "dashboard": args.budget_dashboard}
+    results = {}
+    ok = True
+    with tempfile.TemporaryDirectory(prefix="gym-startup-") as directory:
+        synth.write_dataset(directory, args.rows)
+        for module, budget in budgets.items():
+            result = measure(module, directory, args.repeat)
+            result["budget_seconds"] = budget
+            results[module] = result
+            within = result["import_seconds"] <= budget and not result["deferred_loaded"]
+            ok &= within
+            print(f"{module}: импорт {result['import_seconds']:.3f} с (свой код {result['own_seconds']:.3f} с), "
+                  f"бюджет {budget:.2f} с — {'OK' if within else 'ПРЕВЫШЕН'}")
+            for name, seconds in result["top_dependencies"][:5]:
+                print(f"    {name}: {seconds:.3f} с")
+            if result["deferred_loaded"]:
+                print(f"    загружены при старте: {', '.join(result['deferred_loaded'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
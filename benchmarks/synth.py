@@ -0,0 +1,88 @@
+"""Генератор синтетической истории тренировок.
+
+Запуск из корня репозитория:
+    python -m benchmarks.synth --rows 100000 --out /tmp/bench/workouts.csv
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MUSCLE_GROUPS = ["Грудь", "Спина", "Трицепс", "Плечи", "Бицепс", "Ноги", "Икры", "Пресс"]
+
+
+def generate(rows, users=20, exercises_per_group=5, years=3, bare_share=0.2, seed=0):
+    """Синтетическая история в формате workouts.csv.
+
+    Даты идут по возрастанию, рабочий вес растет со временем, подходов от 1
+    до 5; доля bare_share записей хранит повторения голым числом, как
+    старые строки в настоящем файле.
+    """
+    rng = np.random.default_rng(seed)
+    user = rng.integers(0, users, rows)
+    muscle = rng.integers(0, len(MUSCLE_GROUPS), rows)
+    exercise = rng.integers(0, exercises_per_group, rows)
+
+    days = np.sort(rng.integers(0, 365 * years, rows))
+    dates = (np.datetime64("2023-01-01") + days).astype(str)
+
+    # Базовый вес у каждого упражнения свой, прогресс до +50% за период
+    base = rng.uniform(10, 100, (users, len(MUSCLE_GROUPS), exercises_per_group))
+    progress = 1 + 0.5 * days / max(365 * years, 1)
+    weight = np.round(base[user, muscle, exercise] * progress * 2) / 2
+
+    sets = rng.integers(1, 6, rows)
+    bare = (rng.random(rows) < bare_share) | (sets == 1)
+    sets[bare] = 1
+    values = rng.integers(5, 16, sets.sum())
+    offsets = np.concatenate([[0], np.cumsum(sets)]).tolist()
+    flat = values.tolist()
+    reps = [str(flat[start]) if is_bare else str(tuple(flat[start:end]))
+            for start, end, is_bare in zip(offsets[:-1], offsets[1:], bare.tolist())]
+
+    user_names = np.array([f"Пользователь {i}" for i in range(users)])
+    muscle_names = np.array(MUSCLE_GROUPS)
+    return pd.DataFrame({
+        "user_id": user_names[user],
+        "date": dates,
+        "muscle_group": muscle_names[muscle],
+        "exercise": np.char.add(np.char.add(muscle_names[muscle], " упражнение "), exercise.astype(str)),
+        "weight": weight,
+        "reps": reps,
+    })
+
+
+def user_names_for(df):
+    """Содержимое user_names.json для пользователей из синтетических данных."""
+    return {str(100000 + i): name for i, name in enumerate(pd.unique(df["user_id"]))}
+
+
+def write_dataset(directory, rows, **kwargs):
+    """Пишет workouts.csv и user_names.json в каталог."""
+    os.makedirs(directory, exist_ok=True)
+    df = generate(rows, **kwargs)
+    df.to_csv(os.path.join(directory, "workouts.csv"), sep=';', index=False)
+    with open(os.path.join(directory, "user_names.json"), "w") as f:
+        json.dump(user_names_for(df), f, ensure_ascii=False, indent=2)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--exercises", type=int, default=5, help="упражнений на группу мышц")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="workouts.csv")
+    args = parser.parse_args()
+
+    df = generate(args.rows, args.users, args.exercises, args.years, seed=args.seed)
+    df.to_csv(args.out, sep=';', index=False)
+    print(f"Записано строк: {len(df)} в {args.out}")
+
+
+if __name__ == "__main__":
+    main()
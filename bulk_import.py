@@ -0,0 +1,248 @@
+"""Импорт истории тренировок из CSV-выгрузок.
+
+Файл читается кусками по CHUNK_ROWS строк, поэтому память не зависит от
+его размера. Каждый кусок проверяется и приводится к формату workouts.csv
+векторно: дата к YYYY-MM-DD, вес к числу, повторения к строке с tuple
+('9', '9 8', '(12, 10)' -> '(9,)', '(9, 8)', '(12, 10)'; пробелы и запятые
+одинаково разделяют повторения). Пользователь —
+имя или Telegram id из user_names.json. Корректные строки сначала пишутся
+во временный файл рядом с данными, а после проверки всего файла
+дописываются в хранилище одной записью.
+
+Ожидаются колонки workouts.csv (user_id, date, muscle_group, exercise,
+weight, reps) или их русские названия, разделитель — ';' или ','.
+
+Запуск при остановленном боте (бот читает хранилище только при старте;
+при работающем боте файл можно отправить ему документом). Запущенный бот
+держит блокировку BOT_LOCK_FILE, и пока она занята, импорт не выполняется:
+    python bulk_import.py history.csv
+    python bulk_import.py history.csv --user Иван --dry-run
+"""
+import argparse
+import fcntl
+import json
+import logging
+import sys
+import tempfile
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import events
+import reps
+import storage
+from journal import COLUMNS
+
+logger = logging.getLogger(__name__)
+
+USER_NAMES_FILE = "user_names.json"
+# Блокировка, которую держит запущенный бот (flock снимается и при аварийной остановке)
+BOT_LOCK_FILE = "gym_bot.lock"
+CHUNK_ROWS = 50_000
+# Сколько примеров отклоненных строк показывать
+MAX_ERRORS = 10
+MAX_NAME_LENGTH = 100
+MAX_WEIGHT = 1000
+
+# Названия колонок в выгрузках -> колонки workouts.csv
+ALIASES = {
+    "user": "user_id", "name": "user_id", "пользователь": "user_id", "имя": "user_id",
+    "дата": "date",
+    "muscle": "muscle_group", "группа": "muscle_group", "группа мышц": "muscle_group",
+    "упражнение": "exercise",
+    "вес": "weight",
+    "повторения": "reps", "повторений": "reps",
+}
+
+
+class ImportReport(NamedTuple):
+    """Итог импорта: принятые и отклоненные строки, пользователи, примеры ошибок."""
+    imported: int
+    rejected: int
+    users: list
+    errors: list
+
+
+def _column_name(name):
+    name = str(name).strip().lower()
+    return ALIASES.get(name, name)
+
+
+def _separator(path):
+    """';' или ',' по строке заголовка."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        header = f.readline()
+    return ';' if header.count(';') >= header.count(',') else ','
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Куски выгрузки со строковыми колонками и приведенными названиями."""
+    chunks = pd.read_csv(path, sep=_separator(path), dtype=str, keep_default_na=False,
+                         encoding="utf-8-sig", chunksize=chunk_rows)
+    for chunk in chunks:
+        yield chunk.rename(columns=_column_name)
+
+
+def _parse_dates(values):
+    dates = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    missing = dates.isna()
+    if missing.any():
+        # Выгрузки русскоязычных приложений: 31.12.2024
+        dates[missing] = pd.to_datetime(values[missing], errors="coerce", format="%d.%m.%Y")
+    return dates
+
+
+def normalize(chunk, user_names, user=None):
+    """Строки куска в формате workouts.csv и причины отказа по строкам ('' — строка принята).
+
+    user задает пользователя для всех строк, иначе нужна колонка user_id.
+    """
+    required = ["date", "muscle_group", "exercise", "weight", "reps"] + ([] if user else ["user_id"])
+    missing = [column for column in required if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"В файле нет колонок: {', '.join(missing)}")
+
+    chunk = chunk.reset_index(drop=True)
+    reasons = np.full(len(chunk), "", dtype=object)
+
+    def reject(mask, reason):
+        reasons[np.asarray(mask, dtype=bool) & (reasons == "")] = reason
+
+    if user is None:
+        # Telegram id переводится в имя, имена оставляются как есть
+        values = chunk["user_id"].str.strip()
+        names = values.map(user_names)
+        names = names.where(names.notna(), values.where(values.isin(set(user_names.values()))))
+        reject(names.isna(), "неизвестный пользователь")
+        user_ids = names.fillna("")
+    else:
+        user_ids = pd.Series(user, index=chunk.index)
+
+    dates = _parse_dates(chunk["date"].str.strip())
+    reject(dates.isna(), "некорректная дата")
+
+    texts = {}
+    for column in ("muscle_group", "exercise"):
+        texts[column] = chunk[column].str.strip()
+        lengths = texts[column].str.len()
+        reject(lengths == 0, f"пустое поле {column}")
+        reject(lengths > MAX_NAME_LENGTH, f"слишком длинное поле {column}")
+
+    weight = pd.to_numeric(chunk["weight"].str.strip().str.replace(",", ".", regex=False), errors="coerce")
+    reject(~np.isfinite(weight.to_numpy(dtype=np.float64)) | (weight < 0) | (weight > MAX_WEIGHT),
+           "некорректный вес")
+
+    normalized_reps, valid_reps = reps.normalize(chunk["reps"])
+    reject(~valid_reps, "некорректные повторения")
+
+    accepted = reasons == ""
+    rows = pd.DataFrame({
+        "user_id": user_ids,
+        "date": dates.dt.strftime("%Y-%m-%d"),
+        "muscle_group": texts["muscle_group"],
+        "exercise": texts["exercise"],
+        "weight": weight.astype(str),
+        "reps": normalized_reps,
+    }, columns=COLUMNS)[accepted]
+    return rows.reset_index(drop=True), reasons
+
+
+def _staged_chunks(staged, chunk_rows):
+    staged.seek(0)
+    return pd.read_csv(staged, sep=';', header=None, names=COLUMNS, dtype=str,
+                       keep_default_na=False, chunksize=chunk_rows)
+
+
+def import_file(path, workouts, user_names, user=None, chunk_rows=CHUNK_ROWS, directory=".",
+                on_rows=None, dry_run=False):
+    """Импортирует выгрузку в хранилище и возвращает ImportReport.
+
+    on_rows вызывается для каждого куска после успешной записи (например,
+    чтобы бот добавил подходы в память). При dry_run файл только проверяется.
+    """
+    imported, rejected, users, errors = 0, 0, {}, []
+    with tempfile.NamedTemporaryFile("w+", dir=directory, prefix=".import-", suffix=".csv",
+                                     encoding="utf-8", newline="") as staged:
+        position = 0
+        for chunk in read_chunks(path, chunk_rows):
+            rows, reasons = normalize(chunk, user_names, user)
+            # Запись в сам файл, а не в обертку NamedTemporaryFile: csv пишет построчно
+            rows.to_csv(staged.file, sep=';', header=False, index=False, lineterminator='\n')
+            imported += len(rows)
+            users.update(dict.fromkeys(rows["user_id"].unique()))
+            bad = np.flatnonzero(reasons != "")
+            rejected += len(bad)
+            # Номер строки в файле с учетом заголовка
+            errors.extend(f"строка {position + i + 2}: {reasons[i]}" for i in bad[:MAX_ERRORS - len(errors)])
+            position += len(chunk)
+        staged.flush()
+
+        if imported and not dry_run:
+            workouts.write_frames(_staged_chunks(staged, chunk_rows))
+            if on_rows is not None:
+                for rows in _staged_chunks(staged, chunk_rows):
+                    on_rows(rows)
+    return ImportReport(imported, rejected, list(users), errors)
+
+
+def lock_bot(path=BOT_LOCK_FILE):
+    """Занимает блокировку запущенного бота; она держится, пока открыт возвращенный файл.
+
+    BlockingIOError — блокировку держит другой процесс.
+    """
+    f = open(path, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def bot_running(path=BOT_LOCK_FILE):
+    """Запущен ли бот в текущем каталоге."""
+    try:
+        lock_bot(path).close()
+    except BlockingIOError:
+        return True
+    return False
+
+
+def load_user_names(path=USER_NAMES_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт истории тренировок из CSV")
+    parser.add_argument("path", help="CSV-выгрузка")
+    parser.add_argument("--user", help="пользователь для всех строк (иначе колонка user_id)")
+    parser.add_argument("--storage", choices=storage.BACKENDS, help="хранилище (по умолчанию GYM_STORAGE)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--dry-run", action="store_true", help="только проверить файл")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    if not args.dry_run and bot_running():
+        # Бот не увидел бы импортированные подходы и перезаписал бы снимок устаревшими данными
+        logger.error("Бот запущен: остановите его или отправьте файл боту документом")
+        sys.exit(1)
+    workouts = storage.get_storage(args.storage)
+    report = import_file(args.path, workouts, load_user_names(), args.user, args.chunk_rows,
+                         dry_run=args.dry_run)
+    if report.imported and not args.dry_run:
+        # Дашборд дочитает новые строки из хранилища
+        events.Publisher().publish([], None, workouts.cursor())
+    action = "Проверено" if args.dry_run else "Импортировано"
+    logger.info(f"{action} строк: {report.imported}, отклонено: {report.rejected}, "
+                f"пользователи: {', '.join(report.users) or '-'}")
+    for error in report.errors:
+        logger.warning(error)
+
+
+if __name__ == "__main__":
+    main()
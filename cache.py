@@ -0,0 +1,42 @@
+import threading
+from collections import OrderedDict
+
+
+class VersionedLRUCache:
+    """Ограниченный LRU-кэш значений с версией.
+
+    Для каждого ключа хранится только одна версия значения: запрос с другой
+    версией считается промахом, и новое значение вытесняет старое. Так
+    инвалидация затрагивает только тот ключ, данные которого изменились.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Значение для ключа и версии или None."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != version:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, version, value):
+        """Сохраняет значение, вытесняя самые давно использованные."""
+        with self._lock:
+            self._items[key] = (version, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        """Счетчики попаданий и промахов."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
@@ -0,0 +1,80 @@
+"""Компактные типы колонок тренировок в памяти.
+
+Пользователь, группа мышц и упражнение хранятся как pd.Categorical: фильтр
+по срезу сравнивает целые коды, а не строки. Коды стабильны — новые
+значения дописываются в конец категорий (concat). Дата хранится номером
+дня от 1970-01-01 (int32), вес — во float32 и при чтении округляется до
+WEIGHT_DECIMALS знаков, чтобы 12.3 не превращалось в 12.300000190734863.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORICAL = ["user_id", "muscle_group", "exercise"]
+WEIGHT_DECIMALS = 3
+
+
+def to_days(dates):
+    """Даты (строки YYYY-MM-DD или datetime) в номера дней от 1970-01-01."""
+    # Различных дат немного, поэтому разбираются только уникальные значения
+    codes, uniques = pd.factorize(np.asarray(dates))
+    days = pd.to_datetime(uniques).to_numpy().astype("datetime64[D]").astype(np.int32)
+    return days[codes]
+
+
+def from_days(days):
+    """Номера дней в datetime64 для графиков и агрегатов."""
+    return pd.to_datetime(np.asarray(days, dtype=np.int64), unit="D")
+
+
+def to_day(value):
+    """Номер дня для одной даты (границы окна, удаляемая строка)."""
+    return (pd.Timestamp(value).normalize() - pd.Timestamp(0)).days
+
+
+def to_weight(weights):
+    return np.asarray(pd.to_numeric(weights), dtype=np.float32)
+
+
+def from_weight(weights):
+    """Вес во float64 без погрешности хранения во float32."""
+    return np.round(np.asarray(weights, dtype=np.float64), WEIGHT_DECIMALS)
+
+
+def categorize(df):
+    """Строковые колонки среза в категории (на месте)."""
+    for column in CATEGORICAL:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(str).astype("category")
+    return df
+
+
+def concat(df, new_rows):
+    """DataFrame с дописанными строками; коды категорий уже загруженных строк не меняются."""
+    if df.empty:
+        return new_rows.reset_index(drop=True)
+    left, right = {}, {}
+    for column in CATEGORICAL:
+        categories = df[column].cat.categories
+        added = pd.Index(pd.unique(np.asarray(new_rows[column], dtype=object))).difference(categories)
+        categories = categories.append(added)
+        left[column] = pd.Categorical.from_codes(df[column].cat.codes, categories)
+        right[column] = pd.Categorical(np.asarray(new_rows[column], dtype=object), categories=categories)
+    return pd.concat([df.assign(**left), new_rows.assign(**right)], ignore_index=True)
+
+
+def code(column, value):
+    """Код значения в категориальной колонке или -1, если такого значения нет."""
+    return column.cat.categories.get_indexer([value])[0]
+
+
+def slice_mask(df, user, muscle_group, exercise):
+    """Маска строк среза: сравнение целых кодов категорий."""
+    mask = np.ones(len(df), dtype=bool)
+    if df.empty:
+        return mask
+    for column, value in zip(CATEGORICAL, (user, muscle_group, exercise)):
+        position = code(df[column], value)
+        if position < 0:
+            return np.zeros(len(df), dtype=bool)
+        mask &= df[column].cat.codes.to_numpy() == position
+    return mask
@@ -1,68 +1,390 @@
+import argparse
 import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
+import logging
+from dash import dcc, html, Input, Output, State, callback, clientside_callback, ctx
+from flask import Response
+import plotly.graph_objects as go
 import pandas as pd
 import dash_bootstrap_components as dbc
 from datetime import datetime
-import os
-import pytz
-import ast
+import threading
+import time
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+import numpy as np
+import compact
+import events
+import journal
+import metrics
+import profiling
+import state_snapshot
+import storage
+from cache import VersionedLRUCache
+from analytics import TrainingAnalytics
+from downsample import lttb
+import reps
+
+timezone = ZoneInfo('Europe/Moscow')
+
+# Настройка логирования до первой загрузки данных, как в main.py
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Хранилище тренировок (GYM_STORAGE=csv|sqlite|arrow|sharded), общее с ботом
+workouts = storage.get_storage()
+
+# Метрики для Prometheus, отдаются по адресу /metrics
+callback_seconds = metrics.Histogram("gym_dashboard_callback_seconds", "Время выполнения callback'а")
+reload_seconds = metrics.Histogram("gym_dashboard_reload_seconds",
+                                   "Время обновления снимка данных (kind: full, tail, event, user, snapshot, error)")
+
+# Подготовка загруженных строк: разбор повторений и дат, компактные типы колонок
+def prepare_data(df):
+    # Проверяем и преобразуем колонку reps
+    if 'reps' in df.columns:
+        # Разбираем всю колонку разом и считаем статистику по подходам
+        values, offsets = reps.parse(df['reps'])
+        stats = reps.summarize(values, offsets, df['weight'])
+        df['reps'] = reps.to_tuples(values, offsets)
+        df['max_reps'] = stats['max_reps'].astype(np.int32)
+        df['total_reps'] = stats['total_reps'].astype(np.int32)
+        df['sets'] = stats['sets'].astype(np.int32)
+        df['volume'] = stats['volume']
+    else:
+        df['reps'] = tuple()
+        df['max_reps'] = 0
+        df['total_reps'] = 0
+        df['sets'] = 0
+        df['volume'] = 0.0
+
+    # Дата — номер дня (int32), вес — float32, строки — категории (см. compact)
+    if 'date' in df.columns:
+        df['date'] = compact.to_days(df['date'])
+    else:
+        df['date'] = np.empty(len(df), dtype=np.int32)
+    if 'weight' in df.columns:
+        df['weight'] = compact.to_weight(df['weight'])
+    return compact.categorize(df)
+
+
+class DataSnapshot(NamedTuple):
+    """Снимок данных для callback'ов.
+
+    DataFrame отсортирован по дате и после публикации не изменяется:
+    callback'и только фильтруют его, а новые данные публикуются новым снимком.
+    Версия среза (пользователь, группа, упражнение) меняется, только когда
+    в него приходят новые строки, иначе равна версии последней полной загрузки.
+    """
+    df: pd.DataFrame
+    version: int
+    stamp: object = None
+    cursor: object = None
+    base_version: int = 0
+    slice_versions: dict = {}
+    # Дерево вариантов для фильтров: {пользователь: {группа: {упражнение: None}}}
+    options: dict = {}
+    # Агрегаты для аналитики (тоннаж, 1ПМ, недельный объем, рекорды)
+    analytics: TrainingAnalytics = TrainingAnalytics.empty()
+
+    def slice_version(self, user, muscle_group, exercise):
+        """Версия данных одного среза."""
+        return self.slice_versions.get((user, muscle_group, exercise), self.base_version)
+
+
+EMPTY_COLUMNS = ["user_id", "date", "muscle_group", "exercise", "weight", "reps", "max_reps"]
+
+# Текущий снимок; замена ссылки атомарна, читать его можно без блокировок
+snapshot = DataSnapshot(pd.DataFrame(columns=EMPTY_COLUMNS), 0)
+# Перезагрузкой одновременно занимается только один поток
+_reload_lock = threading.Lock()
+
+
+def _sorted_by_date(df):
+    return df.sort_values("date", kind="stable")
+
+
+def _add_options(options, df):
+    """Дополняет дерево вариантов новыми сочетаниями пользователь/группа/упражнение."""
+    triples = df[['user_id', 'muscle_group', 'exercise']].drop_duplicates()
+    for user, muscle_group, exercise in triples.itertuples(index=False):
+        options.setdefault(user, {}).setdefault(muscle_group, {})[exercise] = None
+    return options
+
+
+def options_tree(options):
+    """Дерево вариантов в виде списков пар для клиента (порядок сохраняется)."""
+    return [[user, [[muscle_group, list(exercises)] for muscle_group, exercises in groups.items()]]
+            for user, groups in options.items()]
+
+
+def _with_rows(current, new_rows, version):
+    """Снимок с дописанными строками: новые версии только у затронутых срезов."""
+    if new_rows.empty:
+        return current._replace(version=version)
+    new_rows = prepare_data(new_rows)
+    df = compact.concat(current.df, new_rows)
+    # Пересортировка нужна, только если новые строки задним числом
+    if not current.df.empty and new_rows['date'].min() < current.df['date'].max():
+        df = _sorted_by_date(df)
+    # Новая версия только у срезов, в которые пришли строки,
+    # и у групп мышц целиком (для недельного объема)
+    slice_versions = dict(current.slice_versions)
+    for user, muscle_group, exercise in zip(new_rows['user_id'], new_rows['muscle_group'], new_rows['exercise']):
+        slice_versions[(user, muscle_group, exercise)] = version
+        slice_versions[(user, muscle_group, None)] = version
+    options = {user: {muscle_group: dict(exercises) for muscle_group, exercises in groups.items()}
+               for user, groups in current.options.items()}
+    options = _add_options(options, new_rows)
+    return current._replace(df=df, version=version, slice_versions=slice_versions,
+                            options=options, analytics=current.analytics.update(new_rows))
+
+
+def _from_frame(df, version):
+    """Снимок по подготовленным данным: версии и агрегаты строятся заново."""
+    return DataSnapshot(df, version, base_version=version, options=_add_options({}, df),
+                        analytics=TrainingAnalytics.from_frame(df))
+
+
+def _with_all_users(data):
+    """При хранении по пользователям в фильтре есть и те, чьи данные еще не загружены."""
+    if not workouts.per_user:
+        return data
+    missing = [user for user in workouts.users() if user not in data.options]
+    if not missing:
+        return data
+    return data._replace(options={**data.options, **{user: {} for user in missing}})
+
+
+def _load_full(current):
+    """Полная загрузка; при хранении по пользователям — только уже открытых."""
+    if not workouts.per_user:
+        return workouts.load_with_cursor()
+    users = list(current.cursor) if isinstance(current.cursor, dict) else workouts.users()[:1]
+    return workouts.load_with_cursor(users)
+
+
+def _reload(current):
+    """Строит следующий снимок. Если бот только дописал строки, читается лишь новый хвост."""
+    stamp = workouts.stamp()
+    if stamp == current.stamp:
+        return current
+    start = time.perf_counter()
+    kind = "full"
+    try:
+        version = current.version + 1
+        tail = workouts.read_since(current.cursor) if current.cursor is not None else None
+        if tail is not None:
+            kind = "tail"
+            new_rows, cursor = tail
+            data = _with_rows(current, new_rows, version)
+            logger.info(f"Дочитано строк: {len(new_rows)}")
+        else:
+            # Полная перезагрузка: первый запуск, перезапись файла или удаления
+            raw, cursor = _load_full(current)
+            data = _from_frame(_sorted_by_date(prepare_data(raw)), version)
+            _snapshot_wanted.set()
+            logger.info(f"Данные загружены полностью: {len(data.df)} строк")
+        return _with_all_users(data._replace(stamp=stamp, cursor=cursor))
 
-timezone = pytz.timezone('Europe/Moscow')
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке данных: {e}")
+        kind = "error"
+        # Публикуем пустой снимок с нужными колонками
+        version = current.version + 1
+        return DataSnapshot(pd.DataFrame(columns=EMPTY_COLUMNS), version, stamp, base_version=version)
+    finally:
+        reload_seconds.observe(time.perf_counter() - start, kind=kind)
+
+
+def _drop_last_row(df, row):
+    """DataFrame без последней строки, совпадающей с удаленной ботом."""
+    mask = (compact.slice_mask(df, row["user_id"], row["muscle_group"], row["exercise"]) &
+            (df["date"].to_numpy() == compact.to_day(row["date"])) &
+            (df["weight"].to_numpy() == np.float32(row["weight"])))
+    matches = df.index[mask]
+    if matches.empty:
+        return df
+    return df.drop(index=matches[-1]).reset_index(drop=True)
+
+
+def _apply_records(current, records, cursor):
+    """Применяет записи бота [(op, row), ...] к снимку в памяти."""
+    version = current.version + 1
+    added, df = [], current.df
+    for op, row in records:
+        if op == journal.OP_ADD:
+            added.append(row)
+            continue
+        # Удаление строки из той же пачки или из уже загруженных данных
+        same = [i for i, new_row in enumerate(added)
+                if all(new_row[key] == row[key] for key in ("user_id", "date", "muscle_group", "exercise"))
+                and float(new_row["weight"]) == float(row["weight"])]
+        if same:
+            del added[same[-1]]
+        else:
+            df = _drop_last_row(df, row)
+    # Агрегаты не умеют вычитать, после удаления они строятся заново по данным в памяти
+    data = current if df is current.df else _from_frame(df, version)
+    data = _with_rows(data, pd.DataFrame(added, columns=journal.COLUMNS), version)
+    return data._replace(stamp=None, cursor=cursor)
+
+
+def apply_event(event):
+    """Обработка уведомления бота о сохраненной пачке записей."""
+    global snapshot
+    with _reload_lock:
+        current = snapshot
+        # Без курсора «до» (импорт истории) записи не передаются, их нужно дочитать
+        following = current.cursor is not None and event["before"] is not None
+        cursor = workouts.follow(current.cursor, event["before"], event["after"]) if following else None
+        if cursor is not None:
+            records = event["records"]
+            if workouts.per_user:
+                # Записи пользователей, чьи данные еще не открывали, прочитаются вместе с ними
+                records = [(op, row) for op, row in records if row["user_id"] in cursor]
+            with reload_seconds.time(kind="event"):
+                snapshot = _with_all_users(_apply_records(current, records, cursor))
+            logger.info(f"Применено записей из уведомления: {len(records)}")
+        else:
+            # Пропущено уведомление или данные изменены не ботом: дочитываем хранилище
+            snapshot = _reload(current._replace(stamp=None))
+
+
+# Функция для получения актуального снимка данных с проверкой хранилища
+def refresh_data():
+    global snapshot
+    current = snapshot
+    # Пока другой поток перезагружает данные, отдаем предыдущий снимок
+    if workouts.stamp() != current.stamp and _reload_lock.acquire(blocking=False):
+        try:
+            snapshot = current = _reload(snapshot)
+        finally:
+            _reload_lock.release()
+    return current
 
-# Функция для загрузки данных с проверкой времени изменения файла
-def load_data():
-    global last_modified_time, df
-    current_modified_time = os.path.getmtime('workouts.csv')
 
-    if 'last_modified_time' not in globals() or current_modified_time != last_modified_time:
-        last_modified_time = current_modified_time
-        try:
-            # Читаем данные с явным указанием типа данных
-            df = pd.read_csv("workouts.csv", sep=';')
-            print("Первые 5 строк после загрузки:")
-            print(df.head())
-
-            # Проверяем и преобразуем колонку reps
-            if 'reps' in df.columns:
-                # Преобразуем строки в tuple, если они не пустые
-                df['reps'] = df['reps'].apply(
-                    lambda x: ast.literal_eval(x) if pd.notnull(x) and isinstance(x, str) else tuple()
-                )
-
-                # Создаем колонку max_reps только если reps содержит tuple
-                df['max_reps'] = df['reps'].apply(
-                    lambda x: max(x) if isinstance(x, tuple) and len(x) > 0 else 0
-                )
-            else:
-                df['reps'] = tuple()
-                df['max_reps'] = 0
-
-            # Преобразуем дату
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
-            else:
-                df['date'] = pd.to_datetime([])
-
-            print("Данные после обработки:")
-            print(df.head())
-            print(f"Данные обновлены в {datetime.now(timezone).strftime('%H:%M:%S')}")
+# Уведомления бота держат снимок актуальным без проверки файлов в callback'ах;
+# если сокет недоступен, данные проверяются при каждом обращении, как раньше
+listener = None
+try:
+    listener = events.Listener(apply_event).start()
+except OSError as e:
+    logger.warning(f"Уведомления от бота недоступны: {e}")
+
 
+@profiling.profiled("load_data")
+def load_data():
+    """Актуальный снимок данных."""
+    if listener is not None:
+        return snapshot
+    return refresh_data()
+
+
+def open_user(user):
+    """Загружает данные пользователя, если они хранятся отдельно и еще не в снимке."""
+    global snapshot
+    if not workouts.per_user or user is None or user in (snapshot.cursor or {}):
+        return snapshot
+    with _reload_lock:
+        current = snapshot
+        if user not in (current.cursor or {}):
+            with reload_seconds.time(kind="user"):
+                rows, user_cursor = workouts.load_user_with_cursor(user)
+                data = _with_rows(current, rows, current.version + 1)
+                snapshot = data._replace(cursor={**(current.cursor or {}), user: user_cursor})
+            logger.info(f"Загружены данные пользователя {user}: {len(rows)} строк")
+        return snapshot
+
+
+# Снимок данных для быстрого перезапуска: сохраняется в фоне после полной
+# загрузки и не реже раза в SNAPSHOT_INTERVAL секунд, если данные менялись
+SNAPSHOT_FILE = "dashboard.snapshot"
+SNAPSHOT_INTERVAL = 600
+_snapshot_wanted = threading.Event()
+
+
+@reload_seconds.timed(kind="snapshot")
+def _restore():
+    """Снимок прошлого запуска, дополненный строками после него, или None."""
+    stamp = workouts.stamp()
+    loaded = state_snapshot.load(SNAPSHOT_FILE, workouts)
+    if loaded is None:
+        return None
+    (df, options, analytics), new_rows, cursor = loaded
+    data = DataSnapshot(df, 1, base_version=1, options=options, analytics=analytics)
+    data = _with_rows(data, new_rows, 2) if len(new_rows) else data
+    logger.info(f"Загружен снимок: {len(df)} строк, новых {len(new_rows)}")
+    return _with_all_users(data._replace(stamp=stamp, cursor=cursor))
+
+
+def snapshot_loop():
+    saved_version = None
+    while True:
+        _snapshot_wanted.wait(SNAPSHOT_INTERVAL)
+        _snapshot_wanted.clear()
+        data = snapshot
+        if data.cursor is None or data.version == saved_version:
+            continue
+        try:
+            state_snapshot.save(SNAPSHOT_FILE, workouts, data.cursor, (data.df, data.options, data.analytics))
+            saved_version = data.version
         except Exception as e:
-            print(f"Ошибка при загрузке данных: {e}")
-            # Создаем пустой DataFrame с нужными колонками
-            df = pd.DataFrame(columns=["user_id", "date", "muscle_group", "exercise", "weight", "reps", "max_reps"])
+            logger.error(f"Ошибка при сохранении снимка: {e}")
 
-    df.sort_values("date", inplace=True)
 
-    return df
+# Первая загрузка; уведомления, пришедшие во время нее, ждут блокировки
+with _reload_lock:
+    snapshot = _restore() or _reload(snapshot)
+threading.Thread(target=snapshot_loop, name="snapshot", daemon=True).start()
+
+# Показатели для графика прогресса
+METRICS = {
+    "weight": "Рабочий вес",
+    "tonnage": "Тоннаж за тренировку",
+    "e1rm": "Расчетный 1ПМ",
+    "weekly_volume": "Недельный объем группы",
+    "records": "Личные рекорды",
+}
+DEFAULT_METRIC = "weight"
+
+# Как часто открытые страницы проверяют, есть ли новые данные (мс)
+LIVE_INTERVAL = 5 * 1000
+
+# Больше WEBGL_THRESHOLD точек рисуются через WebGL, больше MAX_POINTS —
+# прореживаются на сервере (при приближении окно перестраивается подробнее)
+WEBGL_THRESHOLD = 1000
+MAX_POINTS = 2000
+
+# Кэш готовых графиков по срезам (показатель, пользователь, группа, упражнение)
+FIGURE_CACHE_SIZE = 64
+figure_cache = VersionedLRUCache(FIGURE_CACHE_SIZE)
+metrics.register_cache("figures", figure_cache)
 
 # Инициализация приложения Dash
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 server = app.server
 
 
-def build_layout():
+@server.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def dropdown_options(values):
+    return [{'label': value, 'value': value} for value in values]
+
+
+def default_selection(options):
+    """Первые пользователь, группа и упражнение из дерева вариантов."""
+    user = next(iter(options), None)
+    muscle_group = next(iter(options.get(user, {})), None)
+    exercise = next(iter(options.get(user, {}).get(muscle_group, {})), None)
+    return user, muscle_group, exercise
+
+
+def build_layout(options=None, selection=(None, None, None), figure=None, last_update=None, version=0):
+    options = options or {}
+    user, muscle_group, exercise = selection
     return dbc.Container(
         fluid="lg",
         className="py-4",
@@ -97,7 +419,9 @@ def build_layout():
                     ),
                 ],
             ),
-            html.Div(id="last-updated", className="text-muted mt-2"),
+            html.Div(last_update, id="last-updated", className="text-muted mt-2"),
+            # Дерево вариантов для фильтров: зависимые списки обновляются в браузере
+            dcc.Store(id='options-tree', data=options_tree(options)),
             html.Hr(className="my-3"),
 
             # ===== Filters card =====
@@ -114,39 +438,64 @@ def build_layout():
                                         dbc.Label("Пользователь", className="text-muted"),
                                         dcc.Dropdown(
                                             id='user-dropdown',
-                                            options=[],
-                                            value=None,
+                                            options=dropdown_options(options),
+                                            value=user,
                                             clearable=False
                                         ),
                                     ],
                                     xs=12,
-                                    md=4,
+                                    md=3,
                                 ),
                                 dbc.Col(
                                     [
                                         dbc.Label("Мышечная группа", className="text-muted"),
                                         dcc.Dropdown(
                                             id='muscle-dropdown',
-                                            options=[],
-                                            value=None,
+                                            options=dropdown_options(options.get(user, {})),
+                                            value=muscle_group,
                                             clearable=False
                                         ),
                                     ],
                                     xs=12,
-                                    md=4,
+                                    md=3,
                                 ),
                                 dbc.Col(
                                     [
                                         dbc.Label("Упражнение", className="text-muted"),
                                         dcc.Dropdown(
                                             id='exercise-dropdown',
-                                            options=[],
-                                            value=None,
+                                            options=dropdown_options(options.get(user, {}).get(muscle_group, {})),
+                                            value=exercise,
+                                            clearable=False
+                                        ),
+                                    ],
+                                    xs=12,
+                                    md=3,
+                                ),
+                                dbc.Col(
+                                    [
+                                        dbc.Label("Показатель", className="text-muted"),
+                                        dcc.Dropdown(
+                                            id='metric-dropdown',
+                                            options=[{'label': label, 'value': value} for value, label in METRICS.items()],
+                                            value=DEFAULT_METRIC,
                                             clearable=False
                                         ),
                                     ],
                                     xs=12,
-                                    md=4,
+                                    md=3,
+                                ),
+                                dbc.Col(
+                                    [
+                                        dbc.Label("Период", className="text-muted"),
+                                        dcc.DatePickerRange(
+                                            id='date-range',
+                                            display_format='DD.MM.YYYY',
+                                            clearable=True,
+                                            className="d-block",
+                                        ),
+                                    ],
+                                    xs=12,
                                 ),
                             ],
                         )
@@ -167,6 +516,7 @@ def build_layout():
                                     dbc.Spinner(
                                         dcc.Graph(
                                             id='progress-graph',
+                                            figure=figure,
                                             config={"displayModeBar": False},
                                         ),
                                         color="primary",
@@ -179,63 +529,179 @@ def build_layout():
                 ],
             ),
 
-            # Скрытый компонент для автоматического обновления (закомментирован)
-            # dcc.Interval(
-            #     id='interval-component',
-            #     interval=120*1000,  # 120 секунд
-            #     n_intervals=0
-            # )
+            # Проверка версии данных: график и фильтры обновляются, только когда
+            # пришли новые подходы (без обращения к файлам на сервере)
+            dcc.Interval(
+                id='interval-component',
+                interval=LIVE_INTERVAL,
+                n_intervals=0
+            ),
+            # [версия при прошлой проверке, текущая версия]
+            dcc.Store(id='data-version', data=[version, version]),
         ],
     )
 
 
-app.layout = html.Div(children=build_layout())
+def serve_layout():
+    """Страница целиком: фильтры и первый график приходят в одном ответе,
+    без цепочки callback'ов при открытии."""
+    data = load_data()
+    selection = default_selection(data.options)
+    last_update = f"Последнее обновление: {datetime.now(timezone).strftime('%H:%M:%S')}"
+    return html.Div(children=build_layout(data.options, selection, render_figure(*selection), last_update, data.version))
+
+
+
+# Проверка версии данных по таймеру: дешевое сравнение номера снимка
+@callback(
+    Output('data-version', 'data'),
+    Input('interval-component', 'n_intervals'),
+    State('data-version', 'data'),
+    prevent_initial_call=True
+)
+@callback_seconds.timed(callback="check_version")
+def check_version(n_intervals, known):
+    version = load_data().version
+    if version == known[1]:
+        return dash.no_update
+    return [known[1], version]
 
 
 # Callback для обновления данных и dropdown пользователей
 @callback(
+    Output('options-tree', 'data'),
     Output('user-dropdown', 'options'),
     Output('user-dropdown', 'value'),
     Output('last-updated', 'children'),
     Input('refresh-button', 'n_clicks'),
-    # Input('interval-component', 'n_intervals')  # Закомментировано
+    Input('data-version', 'data'),
+    prevent_initial_call=True
 )
-def update_data(n_clicks, n_intervals=None):  # Убрал n_intervals из обязательных аргументов
-    df = load_data()
-    user_options = [{'label': user, 'value': user} for user in df['user_id'].unique()]
-    default_user = user_options[0]['value'] if user_options else None
+@callback_seconds.timed(callback="update_data")
+def update_data(n_clicks, data_version):
+    # Кнопка принудительно сверяет данные с хранилищем
+    data = refresh_data() if ctx.triggered_id == 'refresh-button' else load_data()
+    options = data.options
+    # При новых данных выбранный пользователь не сбрасывается
+    default_user = default_selection(options)[0] if ctx.triggered_id == 'refresh-button' else dash.no_update
     last_update = f"Последнее обновление: {datetime.now(timezone).strftime('%H:%M:%S')}"
-    return user_options, default_user, last_update
+    return options_tree(options), dropdown_options(options), default_user, last_update
 
 
-# Callback для обновления dropdown мышечных групп
+# Данные пользователя, которые хранятся отдельно, загружаются при его выборе
 @callback(
+    Output('options-tree', 'data', allow_duplicate=True),
+    Input('user-dropdown', 'value'),
+    prevent_initial_call=True
+)
+@callback_seconds.timed(callback="select_user")
+def select_user(selected_user):
+    if not workouts.per_user or selected_user in (load_data().cursor or {}):
+        return dash.no_update
+    return options_tree(open_user(selected_user).options)
+
+
+# Dropdown мышечных групп и упражнений заполняются в браузере из дерева вариантов;
+# при обновлении дерева выбранные значения сохраняются, если они еще есть
+clientside_callback(
+    """
+    function(selectedUser, tree, selectedMuscle) {
+        const user = (tree || []).find(entry => entry[0] === selectedUser);
+        const groups = user ? user[1].map(entry => entry[0]) : [];
+        const options = groups.map(group => ({label: group, value: group}));
+        const value = groups.includes(selectedMuscle) ? selectedMuscle : (groups.length ? groups[0] : null);
+        return [options, value];
+    }
+    """,
     Output('muscle-dropdown', 'options'),
     Output('muscle-dropdown', 'value'),
-    Input('user-dropdown', 'value')
+    Input('user-dropdown', 'value'),
+    Input('options-tree', 'data'),
+    State('muscle-dropdown', 'value'),
+    prevent_initial_call=True
 )
-def update_muscle_dropdown(selected_user):
-    df = load_data()
-    filtered_df = df[df['user_id'] == selected_user]
-    muscle_options = [{'label': mg, 'value': mg} for mg in filtered_df['muscle_group'].unique()]
-    default_value = muscle_options[0]['value'] if muscle_options else None
-    return muscle_options, default_value
-
 
-# Callback для обновления dropdown упражнений
-@callback(
+clientside_callback(
+    """
+    function(selectedUser, selectedMuscle, tree, selectedExercise) {
+        const user = (tree || []).find(entry => entry[0] === selectedUser);
+        const group = user ? user[1].find(entry => entry[0] === selectedMuscle) : null;
+        const exercises = group ? group[1] : [];
+        const options = exercises.map(exercise => ({label: exercise, value: exercise}));
+        const value = exercises.includes(selectedExercise) ? selectedExercise : (exercises.length ? exercises[0] : null);
+        return [options, value];
+    }
+    """,
     Output('exercise-dropdown', 'options'),
     Output('exercise-dropdown', 'value'),
     Input('user-dropdown', 'value'),
-    Input('muscle-dropdown', 'value')
+    Input('muscle-dropdown', 'value'),
+    Input('options-tree', 'data'),
+    State('exercise-dropdown', 'value'),
+    prevent_initial_call=True
 )
-def update_exercise_dropdown(selected_user, selected_muscle):
-    df = load_data()
-    filtered_df = df[(df['user_id'] == selected_user) &
-                     (df['muscle_group'] == selected_muscle)]
-    exercise_options = [{'label': ex, 'value': ex} for ex in filtered_df['exercise'].unique()]
-    default_value = exercise_options[0]['value'] if exercise_options else None
-    return exercise_options, default_value
+
+
+def in_window(df, column, window):
+    """Строки, у которых дата попадает в окно (start, end); None — без границы."""
+    start, end = window
+    # В основном DataFrame даты — номера дней, в таблицах аналитики — datetime
+    bound = compact.to_day if pd.api.types.is_integer_dtype(df[column]) else pd.Timestamp
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df[column] >= bound(start)
+    if end is not None:
+        mask &= df[column] <= bound(end)
+    return df[mask]
+
+
+def message_figure(text):
+    """Пустой график с сообщением вместо данных."""
+    return go.Figure(layout=dict(title=text))
+
+
+def build_metric_figure(analytics, metric, user, muscle_group, exercise, window=(None, None)):
+    """График по агрегатам аналитики для выбранного показателя."""
+    # plotly.express долго импортируется и нужен только для построения графиков
+    import plotly.express as px
+    if metric == "tonnage":
+        stats = in_window(analytics.session_stats(user, muscle_group, exercise), 'date', window)
+        fig = px.bar(stats, x='date', y='tonnage', title=f"Тоннаж за тренировку: {exercise}",
+                     labels={'date': "Дата", 'tonnage': "Тоннаж (кг)"})
+    elif metric == "e1rm":
+        stats = in_window(analytics.session_stats(user, muscle_group, exercise), 'date', window)
+        fig = px.line(stats, x='date', y='e1rm', markers=True, title=f"Расчетный 1ПМ (Эпли): {exercise}",
+                      labels={'date': "Дата", 'e1rm': "1ПМ (кг)"}, hover_data=['top_weight'])
+    elif metric == "weekly_volume":
+        stats = in_window(analytics.weekly_volume(user, muscle_group), 'week', window)
+        fig = px.bar(stats, x='week', y='volume', title=f"Недельный объем: {muscle_group}",
+                     labels={'week': "Неделя", 'volume': "Объем (кг)"})
+    elif metric == "records":
+        stats = in_window(analytics.personal_records(user, muscle_group, exercise), 'date', window)
+        fig = px.line(stats, x='date', y='e1rm', markers=True, line_shape='hv',
+                      title=f"Личные рекорды: {exercise}",
+                      labels={'date': "Дата", 'e1rm': "1ПМ (кг)"}, hover_data=['weight', 'reps'])
+    else:
+        raise ValueError(f"Неизвестный показатель: {metric}")
+
+    if stats.empty:
+        return message_figure("Нет данных для выбранных параметров")
+    fig.update_layout(
+        plot_bgcolor='rgba(240, 240, 240, 0.8)',
+        paper_bgcolor='rgba(240, 240, 240, 0.1)',
+        margin=dict(l=10, r=10, t=70, b=10),
+    )
+    return fig
+
+
+def zoom_window(relayout_data):
+    """Видимый диапазон дат после приближения графика или None."""
+    relayout_data = relayout_data or {}
+    if 'xaxis.range[0]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return None
 
 
 # Callback для обновления графика прогресса
@@ -243,40 +709,100 @@ def update_exercise_dropdown(selected_user, selected_muscle):
     Output('progress-graph', 'figure'),
     Input('user-dropdown', 'value'),
     Input('muscle-dropdown', 'value'),
-    Input('exercise-dropdown', 'value')
+    Input('exercise-dropdown', 'value'),
+    Input('metric-dropdown', 'value'),
+    Input('date-range', 'start_date'),
+    Input('date-range', 'end_date'),
+    Input('progress-graph', 'relayoutData'),
+    Input('data-version', 'data'),
+    prevent_initial_call=True
 )
-def update_graph(selected_user, selected_muscle, selected_exercise):
-    df = load_data()
-    print(f"Обновление графика для: {selected_user}, {selected_muscle}, {selected_exercise}")
+@callback_seconds.timed(callback="update_graph")
+@profiling.profiled("update_graph")
+def update_graph(selected_user, selected_muscle, selected_exercise, selected_metric,
+                 start_date, end_date, relayout_data, data_version):
+    window = (start_date, end_date)
+    if ctx.triggered_id == 'data-version':
+        # Перерисовываем, только если изменились данные выбранного среза
+        slice_key = (selected_user, selected_muscle, None if selected_metric == "weekly_volume" else selected_exercise)
+        if load_data().slice_version(*slice_key) <= data_version[0]:
+            return dash.no_update
+        # Приближение сохраняется
+        window = zoom_window(relayout_data) or window
+    if ctx.triggered_id == 'progress-graph':
+        # Приближение: перестраиваем видимое окно в полном разрешении,
+        # сброс масштаба возвращает выбранный период
+        zoom = zoom_window(relayout_data)
+        if zoom is not None:
+            window = zoom
+        elif not (relayout_data or {}).get('xaxis.autorange'):
+            return dash.no_update
+    return render_figure(selected_user, selected_muscle, selected_exercise, selected_metric, window)
+
+
+def render_figure(selected_user, selected_muscle, selected_exercise,
+                  selected_metric=DEFAULT_METRIC, window=(None, None)):
+    """Строит график прогресса (или берет из кэша) для выбранных фильтров и окна дат."""
+    data = load_data()
+    df = data.df
 
     if selected_user is None or selected_muscle is None or selected_exercise is None:
-        return px.scatter(title="Выберите параметры для отображения графика")
+        return message_figure("Выберите параметры для отображения графика")
+
+    # Если срез не менялся, отдаем уже построенный график.
+    # Недельный объем зависит от всей группы мышц, а не от упражнения
+    if selected_metric == "weekly_volume":
+        slice_key = (selected_metric, selected_user, selected_muscle, None)
+    else:
+        slice_key = (selected_metric, selected_user, selected_muscle, selected_exercise)
+    slice_version = data.slice_version(*slice_key[1:])
+    # В кэше только графики без окна дат
+    cacheable = window == (None, None)
+    figure = figure_cache.get(slice_key, slice_version) if cacheable else None
+    if figure is not None:
+        return figure
+
+    if selected_metric != DEFAULT_METRIC:
+        try:
+            figure = build_metric_figure(data.analytics, selected_metric, selected_user,
+                                         selected_muscle, selected_exercise, window).to_plotly_json()
+        except Exception as e:
+            logger.error(f"Ошибка при создании графика: {e}")
+            return message_figure("Ошибка при отображении данных")
+        if cacheable:
+            figure_cache.put(slice_key, slice_version, figure)
+        return figure
 
     # Проверяем наличие необходимых колонок
     required_cols = ['user_id', 'muscle_group', 'exercise', 'date', 'weight']
     if not all(col in df.columns for col in required_cols):
-        print("Отсутствуют необходимые колонки в DataFrame")
-        return px.scatter(title="Ошибка: данные неполные")
+        logger.error("Отсутствуют необходимые колонки в DataFrame")
+        return message_figure("Ошибка: данные неполные")
 
-    # Фильтруем данные
-    filtered_df = df[(df["user_id"] == selected_user) &
-                     (df["muscle_group"] == selected_muscle) &
-                     (df["exercise"] == selected_exercise)]
-
-    print(f"Найдено записей: {len(filtered_df)}")
-    if not filtered_df.empty:
-        print(filtered_df[['date', 'weight', 'reps']].head())
+    # Фильтруем данные по кодам категорий
+    filtered_df = df[compact.slice_mask(df, selected_user, selected_muscle, selected_exercise)]
+    filtered_df = in_window(filtered_df, 'date', window)
+    filtered_df = filtered_df.assign(date=compact.from_days(filtered_df['date']),
+                                     weight=compact.from_weight(filtered_df['weight']))
 
     if filtered_df.empty:
-        return px.scatter(title="Нет данных для выбранных параметров")
+        return message_figure("Нет данных для выбранных параметров")
 
     try:
+        import plotly.express as px
         # Если есть колонка max_reps, используем ее, иначе создаем временную
         if 'max_reps' not in filtered_df.columns:
             filtered_df['max_reps'] = filtered_df['reps'].apply(
                 lambda x: max(x) if isinstance(x, tuple) and len(x) > 0 else 0
             )
 
+        # Длинную историю прореживаем до MAX_POINTS точек с сохранением формы
+        if len(filtered_df) > MAX_POINTS:
+            keep = lttb(filtered_df['date'].to_numpy(dtype='datetime64[ns]').astype('int64'),
+                        filtered_df['weight'].to_numpy(), MAX_POINTS)
+            filtered_df = filtered_df.iloc[keep]
+        webgl = len(filtered_df) > WEBGL_THRESHOLD
+
         # Определяем диапазон для цветовой шкалы
         min_reps = filtered_df['max_reps'].min()
         max_reps = filtered_df['max_reps'].max()
@@ -296,11 +822,12 @@ def update_graph(selected_user, selected_muscle, selected_exercise):
             range_color=[min_reps, max_reps],
             title=f"Прогресс в упражнении {selected_exercise}",
             hover_data=['reps'],
-            size=[24] * len(filtered_df)
+            render_mode='webgl' if webgl else 'auto'
         )
 
         # Добавляем линии между точками
-        fig.add_scatter(
+        line_trace = go.Scattergl if webgl else go.Scatter
+        fig.add_trace(line_trace(
             x=filtered_df['date'],
             y=filtered_df['weight'],
             mode='lines+markers',
@@ -308,7 +835,7 @@ def update_graph(selected_user, selected_muscle, selected_exercise):
             marker=dict(size=0),
             showlegend=False,
             hoverinfo='skip'
-        )
+        ))
 
         # Настраиваем отображение
         fig.update_traces(
@@ -334,14 +861,31 @@ def update_graph(selected_user, selected_muscle, selected_exercise):
             plot_bgcolor='rgba(240, 240, 240, 0.8)',
             paper_bgcolor='rgba(240, 240, 240, 0.1)',
             margin=dict(l=10, r=10, t=70, b=10),
+            # Масштаб, выбранный пользователем, сохраняется при перестроении окна
+            uirevision=str(slice_key),
         )
 
-        return fig
+        figure = fig.to_plotly_json()
+        if cacheable:
+            figure_cache.put(slice_key, slice_version, figure)
+        return figure
 
     except Exception as e:
-        print(f"Ошибка при создании графика: {e}")
-        return px.scatter(title="Ошибка при отображении данных")
+        logger.error(f"Ошибка при создании графика: {e}")
+        return message_figure("Ошибка при отображении данных")
+
+
+# Dash проверяет id в callback'ах по макету; без готового макета он вызвал бы
+# serve_layout (с построением графика) прямо при импорте
+app.validation_layout = html.Div(children=build_layout())
+app.layout = serve_layout
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Дашборд прогресса тренировок")
+    # manager.sh ищет процесс дашборда по этому аргументу
+    parser.add_argument("--bot", default="gym", help="имя экземпляра бота")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args)
     app.run(debug=False, host='0.0.0.0', port=8080)
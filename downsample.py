@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def lttb(x, y, n_out):
+    """Индексы точек, отобранных алгоритмом Largest-Triangle-Three-Buckets.
+
+    Точки делятся на n_out - 2 корзины; из каждой берется та, что образует
+    наибольший треугольник с предыдущей выбранной точкой и средним по
+    следующей корзине. Первая и последняя точки сохраняются всегда.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
@@ -0,0 +1,95 @@
+"""Уведомления об изменениях тренировок от бота к дашборду.
+
+После каждой сохраненной пачки бот отправляет в Unix-сокет дейтаграмму
+с записями пачки и курсорами хранилища до и после записи. Дашборд
+применяет записи к данным в памяти, если его курсор совпадает с курсором
+«до», а иначе (уведомление потеряно, данные меняли не через бота)
+дочитывает изменения из хранилища. После импорта истории отправляется
+уведомление без записей и без курсора «до»: новые строки дашборд
+дочитывает сам. Если дашборд не запущен, уведомления
+просто никуда не доходят.
+"""
+import contextlib
+import json
+import logging
+import os
+import socket
+import threading
+
+from storage import normalize_reps
+
+logger = logging.getLogger(__name__)
+
+EVENTS_SOCKET = "workouts.sock"
+MAX_DATAGRAM = 1 << 20
+
+
+def _tuples(value):
+    """Восстанавливает tuple в курсоре после JSON."""
+    if isinstance(value, list):
+        return tuple(_tuples(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _tuples(item) for key, item in value.items()}
+    return value
+
+
+def encode(records, before, after):
+    rows = [[op, dict(row, reps=normalize_reps(row["reps"]))] for op, row in records]
+    return json.dumps({"before": before, "after": after, "records": rows}, ensure_ascii=False).encode("utf-8")
+
+
+def decode(data):
+    event = json.loads(data.decode("utf-8"))
+    event["before"] = _tuples(event["before"])
+    event["after"] = _tuples(event["after"])
+    event["records"] = [(op, row) for op, row in event["records"]]
+    return event
+
+
+class Publisher:
+    """Отправка уведомлений из бота; никогда не блокирует и не падает."""
+
+    def __init__(self, path=EVENTS_SOCKET):
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def publish(self, records, before, after):
+        """Сообщает о записях [(op, row), ...], сохраненных между курсорами before и after."""
+        try:
+            self._sock.sendto(encode(records, before, after), self.path)
+        except OSError as e:
+            # Дашборд не запущен или не успевает читать: он дочитает изменения из хранилища
+            logger.debug(f"Уведомление не отправлено: {e}")
+
+
+class Listener:
+    """Прием уведомлений в фоновом потоке дашборда."""
+
+    def __init__(self, on_event, path=EVENTS_SOCKET):
+        self.path = path
+        self._on_event = on_event
+        self._sock = None
+
+    def start(self):
+        """Открывает сокет и запускает поток; OSError, если сокет недоступен."""
+        # Сокет от предыдущего запуска мешает bind
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        threading.Thread(target=self._run, name="events-listener", daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            data = self._sock.recv(MAX_DATAGRAM)
+            try:
+                event = decode(data)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Некорректное уведомление: {e}")
+                continue
+            try:
+                self._on_event(event)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке уведомления: {e}")
@@ -0,0 +1,293 @@
+import csv
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Основной файл с тренировками и журнал изменений поверх него
+WORKOUTS_FILE = "workouts.csv"
+JOURNAL_FILE = "workouts.journal"
+COLUMNS = ["user_id", "date", "muscle_group", "exercise", "weight", "reps"]
+
+# Операции журнала: новый подход и «надгробие» для удаленного подхода
+OP_ADD = "+"
+OP_DELETE = "-"
+
+# Дозапись в журнал и компакция не должны пересекаться
+_lock = threading.Lock()
+
+
+# Хэши содержимого основных файлов: path -> ((inode, size, mtime_ns), sha1)
+_hashes = {}
+
+
+def _content_hash(path, st):
+    """sha1 содержимого файла; пересчитывается, только если файл изменился."""
+    key = (st.st_ino, st.st_size, st.st_mtime_ns)
+    cached = _hashes.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    _hashes[path] = (key, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def _base_stamp(base_path):
+    """Отпечаток основного файла, к которому относится журнал: размер и хэш содержимого.
+
+    От времени изменения отпечаток не зависит: touch, git checkout или
+    копирование без -p не отрывают журнал от основного файла.
+    """
+    try:
+        st = os.stat(base_path)
+    except FileNotFoundError:
+        return "#base;0;0"
+    return f"#base;{st.st_size};{_content_hash(base_path, st)}"
+
+
+def _rotate_orphaned(journal_path, base_path):
+    """Откладывает журнал, который относится к другой версии основного файла.
+
+    Такой журнал уже не будет применен, поэтому новые записи в него не
+    дописываются: он переименовывается в <журнал>.orphaned-<время> для
+    ручного разбора, а запись начинается с нового журнала.
+    Вызывается под _lock.
+    """
+    try:
+        with open(journal_path, "rb") as f:
+            header = f.readline()
+    except FileNotFoundError:
+        return
+    if not header.endswith(b"\n") or header.decode("utf-8").rstrip("\n") == _base_stamp(base_path):
+        return
+    orphaned = f"{journal_path}.orphaned-{time.strftime('%Y%m%d-%H%M%S')}"
+    os.replace(journal_path, orphaned)
+    logger.error(f"Журнал {journal_path} не соответствует {base_path} и отложен в {orphaned}")
+
+
+def format_records(records):
+    """Сериализует записи [(op, row), ...] в строки журнала."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=';', lineterminator='\n')
+    for op, row in records:
+        reps = row["reps"]
+        if isinstance(reps, (tuple, list)):
+            reps = str(tuple(reps))
+        writer.writerow([op, row["user_id"], row["date"], row["muscle_group"],
+                         row["exercise"], row["weight"], reps])
+    return buf.getvalue()
+
+
+def write(records, journal_path=JOURNAL_FILE, base_path=WORKOUTS_FILE):
+    """Дописывает записи [(op, row), ...] в конец журнала."""
+    if not records:
+        return
+    data = format_records(records)
+    with _lock:
+        _rotate_orphaned(journal_path, base_path)
+        with open(journal_path, "a", encoding="utf-8", newline="") as f:
+            # Новый журнал начинается с отпечатка основного файла
+            if f.tell() == 0:
+                f.write(_base_stamp(base_path) + "\n")
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def write_frames(frames, journal_path=JOURNAL_FILE, base_path=WORKOUTS_FILE):
+    """Дописывает подходы из DataFrame'ов с колонками COLUMNS одной записью.
+
+    Все куски пишутся под одной блокировкой и синхронизируются с диском
+    один раз в конце. Возвращает количество записанных строк.
+    """
+    count = 0
+    with _lock:
+        _rotate_orphaned(journal_path, base_path)
+        with open(journal_path, "a", encoding="utf-8", newline="") as f:
+            if f.tell() == 0:
+                f.write(_base_stamp(base_path) + "\n")
+            for frame in frames:
+                rows = frame[COLUMNS].copy()
+                rows.insert(0, "op", OP_ADD)
+                rows.to_csv(f, sep=';', header=False, index=False, lineterminator='\n')
+                count += len(rows)
+            f.flush()
+            os.fsync(f.fileno())
+    return count
+
+
+def _parse_records(data):
+    """Разбирает байты журнала, отбрасывая недописанные записи.
+
+    Текст не делится на строки заранее: поле в кавычках может содержать
+    перевод строки. Возвращает (записи, длина данных до конца последней
+    целой записи).
+    """
+    consumed = 0
+
+    def lines():
+        nonlocal consumed
+        for line in io.StringIO(data.decode("utf-8"), newline=""):
+            consumed += len(line.encode("utf-8"))
+            yield line
+
+    records, end = [], 0
+    for rec in csv.reader(lines(), delimiter=';'):
+        if len(rec) == len(COLUMNS) + 1:
+            records.append(rec)
+            end = consumed
+    return records, end
+
+
+def read_tail(journal_path=JOURNAL_FILE, base_path=WORKOUTS_FILE, offset=0, end=None):
+    """Читает записи журнала с позиции offset.
+
+    Возвращает (записи, позиция после последней целой строки, inode журнала).
+    Записи журнала, относящегося к другой версии основного файла, пропускаются.
+    """
+    try:
+        with open(journal_path, "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            header = f.readline()
+            if not header.endswith(b"\n"):
+                return [], 0, inode
+            if header.decode("utf-8").rstrip("\n") != _base_stamp(base_path):
+                logger.warning(f"Журнал {journal_path} не соответствует {base_path}, записи пропущены "
+                               f"(при следующей записи он будет отложен)")
+                return [], 0, inode
+            f.seek(max(offset, len(header)))
+            data = f.read() if end is None else f.read(max(end - f.tell(), 0))
+            start = f.tell() - len(data)
+    except FileNotFoundError:
+        return [], 0, None
+    # Последняя запись может быть еще не дописана
+    data = data[:data.rfind(b"\n") + 1]
+    records, length = _parse_records(data)
+    return records, start + length, inode
+
+
+def read(journal_path=JOURNAL_FILE, base_path=WORKOUTS_FILE, end=None):
+    """Читает записи журнала, относящиеся к текущей версии основного файла."""
+    return read_tail(journal_path, base_path, end=end)[0]
+
+
+def to_frame(records):
+    """Добавленные строки из записей журнала в виде DataFrame."""
+    df = pd.DataFrame([row for op, *row in records if op == OP_ADD], columns=COLUMNS)
+    df["weight"] = pd.to_numeric(df["weight"])
+    return df
+
+
+def _drop_last_added(added, row):
+    """Удаляет последнюю подходящую строку из еще не сохраненных в основной файл."""
+    for i in range(len(added) - 1, -1, -1):
+        if added[i][:4] == row[:4] and float(added[i][4]) == float(row[4]):
+            del added[i]
+            return True
+    return False
+
+
+def replay(df, records):
+    """Применяет записи журнала к DataFrame с основными данными."""
+    if not records:
+        return df
+    added = []
+    dropped = set()
+    for op, *row in records:
+        if op == OP_ADD:
+            added.append(row)
+        elif op == OP_DELETE and not _drop_last_added(added, row):
+            # Удаляется строка из основного файла: ищем последнюю подходящую
+            mask = ((df["user_id"] == row[0]) & (df["date"] == row[1]) &
+                    (df["muscle_group"] == row[2]) & (df["exercise"] == row[3]))
+            candidates = df.loc[mask, "weight"]
+            candidates = candidates[pd.to_numeric(candidates) == float(row[4])]
+            for index in reversed(candidates.index):
+                if index not in dropped:
+                    dropped.add(index)
+                    break
+    if dropped:
+        df = df.drop(index=list(dropped))
+    if added:
+        df = pd.concat([df, pd.DataFrame(added, columns=COLUMNS)], ignore_index=True)
+    return df.reset_index(drop=True)
+
+
+def _read_base(base_path):
+    """Читает основной файл без преобразования типов."""
+    try:
+        return pd.read_csv(base_path, sep=';', dtype=str, keep_default_na=False)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=COLUMNS)
+
+
+def _write_base(df, path):
+    df.to_csv(path, sep=';', index=False)
+
+
+def load(base_path=WORKOUTS_FILE, journal_path=JOURNAL_FILE):
+    """Загружает тренировки из основного файла с учетом журнала."""
+    df = replay(_read_base(base_path), read(journal_path, base_path))
+    df["weight"] = pd.to_numeric(df["weight"])
+    return df
+
+
+def stamp(base_path=WORKOUTS_FILE, journal_path=JOURNAL_FILE):
+    """Отпечаток состояния данных для проверки, изменилось ли что-то."""
+    stamps = []
+    for path in (base_path, journal_path):
+        try:
+            st = os.stat(path)
+            stamps.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def compact(base_path=WORKOUTS_FILE, journal_path=JOURNAL_FILE,
+            read_base=_read_base, write_base=_write_base):
+    """Переносит накопленный журнал в основной файл.
+
+    Пока основной файл переписывается, бот продолжает дописывать журнал:
+    хвост, появившийся за это время, переносится в новый журнал.
+    Формат основного файла задают read_base и write_base.
+    """
+    with _lock:
+        _rotate_orphaned(journal_path, base_path)
+        try:
+            end = os.path.getsize(journal_path)
+        except FileNotFoundError:
+            return
+    records = read(journal_path, base_path, end=end)
+    if not records:
+        return
+
+    df = replay(read_base(base_path), records)
+    base_tmp = base_path + ".tmp"
+    journal_tmp = journal_path + ".tmp"
+    write_base(df, base_tmp)
+    with open(base_tmp, "rb+") as f:
+        os.fsync(f.fileno())
+
+    with _lock:
+        with open(journal_path, "rb") as f:
+            f.seek(end)
+            tail = f.read()
+        with open(journal_tmp, "wb") as f:
+            f.write((_base_stamp(base_tmp) + "\n").encode("utf-8"))
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(base_tmp, base_path)
+        os.replace(journal_tmp, journal_path)
+        _hashes.pop(base_tmp, None)
+    logger.info(f"Журнал перенесен в {base_path}: {len(records)} записей")
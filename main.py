@@ -1,8 +1,18 @@
+import argparse
+import asyncio
 import logging
 import pandas as pd
+import multiprocessing
 import json
+import os
+import secrets
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
+from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import (
     Application,
@@ -12,10 +22,23 @@ from telegram.ext import (
     ConversationHandler,
     ContextTypes
 )
-import pytz
-import ast
+import backup
+import bulk_import
+import events
+import journal
+import metrics
+import profiling
+import progress_chart
+import reps
+import state_snapshot
+import storage
+from cache import VersionedLRUCache
+from update_processor import PerUserUpdateProcessor
+import workout_index
+from workout_index import WorkoutColumns, WorkoutIndex
+from writer import BackgroundWriter
 
-timezone = pytz.timezone('Europe/Moscow')
+timezone = ZoneInfo('Europe/Moscow')
 
 # Настройка логирования
 logging.basicConfig(
@@ -24,22 +47,131 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Загрузка токена
-try:
-    with open("token.txt", "r") as f:
-        TOKEN = f.read().strip()
-except FileNotFoundError:
-    logger.error("Файл token.txt не найден!")
-    exit(1)
-
-# Инициализация DataFrame
-try:
-    df = pd.read_csv("workouts.csv", sep=';')
-    # Преобразование строки с повторениями в tuple
-    if 'reps' in df.columns:
-        df['reps'] = df['reps'].apply(lambda x: ast.literal_eval(x) if pd.notnull(x) else ())
-except FileNotFoundError:
-    df = pd.DataFrame(columns=["user_id", "date", "muscle_group", "exercise", "weight", "reps"])
+# Загрузка токена (при запуске бота, чтобы модуль можно было импортировать без него)
+def load_token():
+    try:
+        with open("token.txt", "r") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        logger.error("Файл token.txt не найден!")
+        exit(1)
+
+# Хранилище тренировок (GYM_STORAGE=csv|sqlite|arrow|sharded)
+workouts = storage.get_storage()
+
+# Снимок разобранных данных для быстрого перезапуска
+SNAPSHOT_FILE = "bot.snapshot"
+
+def load_columns():
+    """История при запуске: снимок и строки после него или все данные целиком.
+
+    При хранении по пользователям при запуске ничего не читается.
+    """
+    if workouts.per_user:
+        return None
+    loaded = state_snapshot.load(SNAPSHOT_FILE, workouts)
+    if loaded is None:
+        return WorkoutColumns.from_frame(workouts.load())
+    columns, new_rows, _ = loaded
+    logger.info(f"Загружен снимок: {len(columns)} записей, новых {len(new_rows)}")
+    return columns.concat(WorkoutColumns.from_frame(new_rows)) if len(new_rows) else columns
+
+# Подходы пользователей, которые еще не перенесены в индекс
+columns = load_columns()
+
+# Индекс для поиска без просмотра всей истории; подходы пользователя
+# попадают в него при первом обращении к ним
+index = WorkoutIndex()
+loaded_users = set()
+
+def read_user(user_name):
+    """Подходы пользователя из хранилища по пользователям (reps — tuple)."""
+    df = workouts.load_user(user_name)
+    # Преобразование повторений в tuple одним проходом по всей колонке
+    df['reps'] = reps.to_tuples(*reps.parse(df['reps']))
+    return df
+
+def user_index(user_name):
+    """Индекс, в котором уже есть подходы пользователя.
+
+    Обработчики сначала вызывают load_user_index: чтение файла пользователя
+    здесь заблокировало бы цикл событий.
+    """
+    if user_name not in loaded_users:
+        if columns is None:
+            index.add_frame(read_user(user_name))
+        else:
+            index.add_rows(columns.rows(user_name))
+        loaded_users.add(user_name)
+    return index
+
+async def load_user_index(user_name):
+    """user_index, при хранении по пользователям читающий файл пользователя в потоке."""
+    if user_name not in loaded_users and columns is None:
+        df = await asyncio.to_thread(read_user, user_name)
+        # Пока файл читался, подходы могли попасть в индекс другим путем
+        if user_name not in loaded_users:
+            index.add_frame(df)
+            loaded_users.add(user_name)
+    return user_index(user_name)
+
+def snapshot_state():
+    """Колонки со всей историей и курсор хранилища; вызывается, когда вся очередь уже записана."""
+    state = columns.without_users(loaded_users)
+    loaded = pd.DataFrame([row for user in loaded_users for row in index.rows(user)], columns=journal.COLUMNS)
+    if len(loaded):
+        state = state.concat(WorkoutColumns.from_frame(loaded))
+    return state, workouts.cursor()
+
+def save_snapshot():
+    """Сохраняет снимок истории; вызывается, когда вся очередь уже записана."""
+    if columns is None:
+        return
+    state, cursor = snapshot_state()
+    state_snapshot.save(SNAPSHOT_FILE, workouts, cursor, state)
+    logger.info(f"Снимок сохранен: {len(state)} записей")
+
+async def save_snapshot_running():
+    """Сохраняет снимок, не останавливая бота."""
+    if columns is None:
+        return
+    # Состояние снимается без await после того, как писатель все сохранил,
+    # поэтому в индексе нет подходов, которых нет в хранилище до курсора
+    await writer.wait_idle()
+    state, cursor = snapshot_state()
+    await asyncio.to_thread(state_snapshot.save, SNAPSHOT_FILE, workouts, cursor, state)
+    logger.info(f"Снимок сохранен: {len(state)} записей")
+
+# Как часто журнал переносится в основное хранилище (секунды)
+COMPACTION_INTERVAL = 3600
+
+# Резервные копии данных в git включаются адресом удаленного репозитория
+# (например, git@github.com:user/gym-data.git или путь к bare-репозиторию)
+BACKUP_REMOTE = os.environ.get("GYM_BACKUP_REMOTE")
+BACKUP_INTERVAL = int(os.environ.get("GYM_BACKUP_INTERVAL", "3600"))
+
+# Режим webhook включается адресом, по которому Telegram будет присылать обновления
+# (например, https://example.com/gym-bot); локальный HTTP-сервер слушает
+# GYM_WEBHOOK_LISTEN:GYM_WEBHOOK_PORT за обратным прокси. Без адреса — polling
+WEBHOOK_URL = os.environ.get("GYM_WEBHOOK_URL")
+WEBHOOK_LISTEN = os.environ.get("GYM_WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("GYM_WEBHOOK_PORT", "8443"))
+# Сколько обновлений разных пользователей обрабатываются одновременно
+CONCURRENT_UPDATES = int(os.environ.get("GYM_CONCURRENT_UPDATES", "32"))
+# Сколько процессов строят графики /progress
+CHART_WORKERS = int(os.environ.get("GYM_CHART_WORKERS", "2"))
+# Наибольший размер CSV с историей, который можно отправить боту
+# (Bot API без локального сервера отдает ботам файлы до 20 МБ)
+IMPORT_MAX_MB = int(os.environ.get("GYM_IMPORT_MAX_MB", "20"))
+# Метрики для Prometheus: http://GYM_METRICS_HOST:GYM_METRICS_PORT/metrics (0 — выключено)
+METRICS_HOST = os.environ.get("GYM_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("GYM_METRICS_PORT", "9101"))
+
+handler_seconds = metrics.Histogram("gym_bot_handler_seconds", "Время обработки обновления обработчиком")
+flush_seconds = metrics.Histogram("gym_bot_flush_seconds", "Время записи пачки фоновым писателем")
+records_written = metrics.Counter("gym_bot_records_written_total", "Записей журнала сохранено")
+records_lost = metrics.Counter("gym_bot_records_lost_total", "Записей журнала, которые не удалось сохранить")
+metrics_server = None
 
 # Файл для хранения имен пользователей
 USER_NAMES_FILE = "user_names.json"
@@ -54,17 +186,65 @@ def load_user_names():
         logger.error(f"Ошибка при загрузке имен пользователей: {e}")
     return {}
 
-# Сохранение имен пользователей в файл
-def save_user_names():
-    try:
-        with open(USER_NAMES_FILE, "w") as f:
-            json.dump(user_names, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"Ошибка при сохранении имен пользователей: {e}")
+# Сохранение имен пользователей в файл (вызывается из фонового писателя)
+@flush_seconds.timed(kind="user_names")
+def save_user_names(names):
+    tmp = USER_NAMES_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(names, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, USER_NAMES_FILE)
 
 # Словарь для хранения имен пользователей {user_id: name}
 user_names = load_user_names()
 
+# Уведомления дашборду о сохраненных подходах
+publisher = events.Publisher()
+
+# Сохранение пачки записей (вызывается из фонового писателя)
+def save_records(records):
+    with flush_seconds.time(kind="records"):
+        before = workouts.cursor()
+        workouts.write(records)
+        publisher.publish(records, before, workouts.cursor())
+    records_written.inc(len(records))
+
+# Бот для сообщений вне обработчиков; задается при запуске (post_init)
+telegram_bot = None
+
+async def report_lost(records):
+    """Откатывает в индексе записи, которые не удалось сохранить, и сообщает о них пользователям."""
+    telegram_ids = {name: user_id for user_id, name in user_names.items()}
+    for op, row in records:
+        user_name = row["user_id"]
+        if op == journal.OP_ADD:
+            # Подход убирается из индекса, если после него не было новых
+            if index.last_entry(user_name) == row:
+                index.delete_last(user_name)
+            text = (f"Не удалось сохранить подход: {row['exercise']}, {row['weight']} кг, "
+                    f"повторения {', '.join(map(str, row['reps']))}. Пожалуйста, введите его еще раз.")
+        else:
+            index.add(row)
+            text = f"Не удалось удалить подход: {row['exercise']}, {row['weight']} кг. Попробуйте /delete_last позже."
+        records_lost.inc()
+        if telegram_bot is not None and user_name in telegram_ids:
+            try:
+                await telegram_bot.send_message(int(telegram_ids[user_name]), text)
+            except Exception as e:
+                logger.error(f"Не удалось сообщить {user_name} о потерянной записи: {e}")
+
+# Все записи на диск идут через фоновый писатель, не блокируя обработчики
+writer = BackgroundWriter(save_records, save_user_names, on_lost=report_lost)
+
+# Графики строятся в отдельных процессах, не блокируя цикл событий.
+# Пул создается при запуске бота (post_init)
+chart_pool = None
+# (user_id, muscle_group, exercise) -> file_id графика в Telegram или PNG,
+# пока график не отправлен; версия — количество и последний подход
+chart_cache = VersionedLRUCache(maxsize=1024)
+metrics.register_cache("charts", chart_cache)
+
 # Состояния диалога
 GET_NAME, SELECT_MUSCLE, INPUT_CUSTOM_MUSCLE, SELECT_EXERCISE, INPUT_CUSTOM_EXERCISE, INPUT_WEIGHT, INPUT_REPS = range(7)
 
@@ -83,9 +263,8 @@ DEFAULT_EXERCISES = {
 
 def get_user_muscle_groups(user_name):
     """Получает список групп мышц для конкретного пользователя"""
-    user_workouts = df[df["user_id"] == user_name]
-    if not user_workouts.empty:
-        muscle_groups = user_workouts["muscle_group"].unique().tolist()
+    muscle_groups = user_index(user_name).muscle_groups(user_name)
+    if muscle_groups:
         # Добавляем группы по умолчанию, если их еще нет
         for group in DEFAULT_MUSCLE_GROUPS:
             if group not in muscle_groups:
@@ -95,7 +274,6 @@ def get_user_muscle_groups(user_name):
 
 def get_user_exercises(user_name, muscle_group):
     """Получает список упражнений для конкретного пользователя и группы мышц"""
-    user_workouts = df[df["user_id"] == user_name]
     exercises = []
     
     # Добавляем упражнения по умолчанию для этой группы мышц
@@ -103,11 +281,9 @@ def get_user_exercises(user_name, muscle_group):
         exercises.extend(DEFAULT_EXERCISES[muscle_group])
     
     # Добавляем упражнения, которые пользователь уже делал для этой группы
-    if not user_workouts.empty:
-        user_exercises = user_workouts[user_workouts["muscle_group"] == muscle_group]["exercise"].unique().tolist()
-        for ex in user_exercises:
-            if ex not in exercises:
-                exercises.append(ex)
+    for ex in user_index(user_name).exercises(user_name, muscle_group):
+        if ex not in exercises:
+            exercises.append(ex)
     
     # Всегда добавляем "Другое" в конце
     if "Другое" not in exercises:
@@ -115,6 +291,7 @@ def get_user_exercises(user_name, muscle_group):
     
     return exercises
 
+@handler_seconds.timed(handler="start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Начало диалога, проверка имени пользователя."""
     user_id = str(update.message.from_user.id)
@@ -122,6 +299,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     # Если имя уже есть, пропускаем этап представления
     if user_id in user_names:
         user_name = user_names[user_id]
+        await load_user_index(user_name)
         muscle_groups = get_user_muscle_groups(user_name)
         reply_keyboard = [muscle_groups[i:i+2] for i in range(0, len(muscle_groups), 2)]
         
@@ -137,6 +315,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return GET_NAME
 
+@handler_seconds.timed(handler="get_name")
 async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка ввода имени пользователя."""
     user_id = str(update.message.from_user.id)
@@ -152,8 +331,9 @@ async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     # Сохраняем имя пользователя
     user_names[user_id] = name
-    save_user_names()
+    writer.submit_user_names(user_names)
     
+    await load_user_index(name)
     muscle_groups = get_user_muscle_groups(name)
     reply_keyboard = [muscle_groups[i:i+2] for i in range(0, len(muscle_groups), 2)]
     
@@ -163,6 +343,7 @@ async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     )
     return SELECT_MUSCLE
 
+@handler_seconds.timed(handler="select_muscle")
 async def select_muscle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка выбора группы мышц."""
     muscle_group = update.message.text
@@ -176,6 +357,7 @@ async def select_muscle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         return INPUT_CUSTOM_MUSCLE
     
     user_name = user_names[str(update.message.from_user.id)]
+    await load_user_index(user_name)
     exercises = get_user_exercises(user_name, muscle_group)
     reply_keyboard = [exercises[i:i+2] for i in range(0, len(exercises), 2)]
     
@@ -185,6 +367,7 @@ async def select_muscle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     )
     return SELECT_EXERCISE
 
+@handler_seconds.timed(handler="input_custom_muscle")
 async def input_custom_muscle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка ручного ввода группы мышц для 'Другое'."""
     custom_muscle = update.message.text
@@ -196,6 +379,8 @@ async def input_custom_muscle(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     return INPUT_CUSTOM_EXERCISE
 
+@handler_seconds.timed(handler="select_exercise")
+@profiling.profiled("select_exercise")
 async def select_exercise(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка выбора упражнения с показом последнего подхода перед вводом веса."""
     exercise = update.message.text
@@ -214,12 +399,9 @@ async def select_exercise(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_name = user_names.get(user_id, "друг")
     muscle_group = context.user_data.get("muscle_group", "")
     
-    user_workouts = df[(df["user_id"] == user_name) & 
-                      (df["muscle_group"] == muscle_group) & 
-                      (df["exercise"] == exercise)]
+    last_workout = (await load_user_index(user_name)).last_set(user_name, muscle_group, exercise)
     
-    if not user_workouts.empty:
-        last_workout = user_workouts.iloc[-1]
+    if last_workout is not None:
         message = (
             f"Последний подход в этом упражнении:\n"
             f"Дата: {last_workout['date']}\n"
@@ -241,6 +423,7 @@ async def select_exercise(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
     return INPUT_WEIGHT
 
+@handler_seconds.timed(handler="input_custom_exercise")
 async def input_custom_exercise(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка ручного ввода упражнения."""
     exercise = update.message.text
@@ -254,6 +437,7 @@ async def input_custom_exercise(update: Update, context: ContextTypes.DEFAULT_TY
     )
     return INPUT_WEIGHT
 
+@handler_seconds.timed(handler="input_weight")
 async def input_weight(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка ввода веса."""
     try:
@@ -271,6 +455,8 @@ async def input_weight(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         )
         return INPUT_WEIGHT
 
+@handler_seconds.timed(handler="input_reps")
+@profiling.profiled("input_reps")
 async def input_reps(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка ввода повторений и сохранение тренировки."""
     try:
@@ -283,26 +469,30 @@ async def input_reps(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             
         user_data = context.user_data
         
-        # Добавляем тренировку в DataFrame
-        global df
+        # Добавляем тренировку в индекс
         new_row = {
             "user_id": user_names[str(update.message.from_user.id)],
-            "date": pd.Timestamp.now(timezone).strftime("%Y-%m-%d"),
+            "date": datetime.now(timezone).strftime("%Y-%m-%d"),
             "muscle_group": user_data["muscle_group"],
             "exercise": user_data["exercise"],
             "weight": user_data["weight"],
             "reps": tuple(reps_list)
         }
         
-        # Сохраняем с сепаратором ;
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        df.to_csv("workouts.csv", sep=';', index=False)
+        # История читается до записи подхода, иначе он попал бы в индекс дважды
+        await load_user_index(new_row["user_id"])
+        # Дописываем подход в журнал вместо перезаписи всего файла
+        writer.submit((journal.OP_ADD, new_row))
+        # Рекорды считаются по текущим максимумам упражнения, без просмотра истории
+        records = user_index(new_row["user_id"]).add(new_row)
         
         await update.message.reply_text(
             f"Тренировка сохранена, {user_names.get(str(update.message.from_user.id), 'друг')}! "
             f"Подходы: {len(reps_list)}, повторения: {', '.join(map(str, reps_list))}\n"
+            f"{format_records(records)}"
             "Нажмите /start для новой записи."
             "\nНажмите /delete_last для удаления последнего подхода"
+            "\nГрафик прогресса в чате: /progress <упражнение>"
             "\nГрафики с прогрессом вы можете посмотреть на http://193.108.54.176:8080/"
         )
         return ConversationHandler.END
@@ -312,6 +502,7 @@ async def input_reps(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return INPUT_REPS
 
+@handler_seconds.timed(handler="cancel")
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Отмена текущей операции."""
     user_name = user_names.get(str(update.message.from_user.id), "друг")
@@ -321,10 +512,9 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     )
     return ConversationHandler.END
 
+@handler_seconds.timed(handler="delete_last")
 async def delete_last(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Удаляет последнюю запись пользователя."""
-    global df
-    
     user_id = str(update.message.from_user.id)
     
     if user_id not in user_names:
@@ -332,24 +522,243 @@ async def delete_last(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         return
     
     user_name = user_names[user_id]
-    user_entries = df[df["user_id"] == user_name]
     
-    if user_entries.empty:
+    # Удаляем последнюю запись, в журнал пишем «надгробие»
+    last_entry = (await load_user_index(user_name)).delete_last(user_name)
+    
+    if last_entry is None:
         await update.message.reply_text("У вас нет сохраненных тренировок!")
         return
     
-    # Находим последнюю запись
-    last_entry_index = user_entries.index[-1]
-    
-    # Удаляем запись
-    df = df.drop(last_entry_index)
-    df.to_csv("workouts.csv", sep=';', index=False)
+    writer.submit((journal.OP_DELETE, last_entry))
     
     await update.message.reply_text("Последняя тренировка удалена!")
 
-def main() -> None:
-    """Запуск бота."""
-    application = Application.builder().token(TOKEN).build()
+# Сообщения о рекордах из WorkoutIndex.add: (вид, значение, прежнее значение)
+RECORD_MESSAGES = {
+    workout_index.TOP_WEIGHT: "рабочий вес {value:g} кг (было {previous:g} кг)",
+    workout_index.REPS_AT_WEIGHT: "повторений с этим весом: {value} (было {previous})",
+    workout_index.E1RM: "расчетный 1ПМ {value:.1f} кг (было {previous:.1f} кг)",
+    workout_index.SESSION_VOLUME: "объем за тренировку {value:g} кг (было {previous:g} кг)",
+}
+
+def format_records(records):
+    """Текст о побитых рекордах или пустая строка."""
+    if not records:
+        return ""
+    lines = [RECORD_MESSAGES[kind].format(value=value, previous=previous) for kind, value, previous in records]
+    return "Новый рекорд! " + "; ".join(lines) + "\n"
+
+def find_exercise(user_name, exercise):
+    """(группа мышц, название, подходы) для упражнения пользователя без учета регистра или None."""
+    index = user_index(user_name)
+    wanted = exercise.casefold()
+    for muscle_group in index.muscle_groups(user_name):
+        for name in index.exercises(user_name, muscle_group):
+            if name.casefold() == wanted:
+                return muscle_group, name, index.sets(user_name, muscle_group, name)
+    return None
+
+@handler_seconds.timed(handler="progress")
+async def progress(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отправляет график прогресса в упражнении."""
+    user_id = str(update.message.from_user.id)
+
+    if user_id not in user_names:
+        await update.message.reply_text("Вы еще не сохраняли тренировки!")
+        return
+
+    exercise = " ".join(context.args or []).strip()
+    if not exercise:
+        await update.message.reply_text("Укажите упражнение, например: /progress Жим лежа")
+        return
+
+    user_name = user_names[user_id]
+    await load_user_index(user_name)
+    found = find_exercise(user_name, exercise)
+    if found is None:
+        await update.message.reply_text(f"Нет сохраненных подходов в упражнении {exercise}.")
+        return
+    muscle_group, exercise, sets = found
+
+    # Подходы меняются только дописыванием и удалением последнего,
+    # поэтому их количество и последний подход однозначно задают график
+    key = (user_name, muscle_group, exercise)
+    version = (len(sets), sets[-1])
+    photo = chart_cache.get(key, version)
+    if photo is None:
+        # Данные копируются до await: индекс может измениться во время построения
+        dates, weights, max_reps = [], [], []
+        for date, weight, reps_tuple in sets:
+            dates.append(date)
+            weights.append(weight)
+            max_reps.append(max(reps_tuple, default=0))
+        try:
+            photo = await asyncio.get_running_loop().run_in_executor(
+                chart_pool, progress_chart.render, exercise, dates, weights, max_reps)
+        except Exception as e:
+            logger.error(f"Ошибка при построении графика: {e}")
+            await update.message.reply_text("Не удалось построить график, попробуйте позже.")
+            return
+        chart_cache.put(key, version, photo)
+
+    message = await update.message.reply_photo(photo)
+    # Повторно отправляется уже загруженный в Telegram файл
+    if message.photo:
+        chart_cache.put(key, version, message.photo[-1].file_id)
+
+# Одновременно идет только один импорт истории
+import_lock = asyncio.Lock()
+
+IMPORT_HELP = (
+    "Отправьте CSV-файл с историей тренировок документом.\n"
+    "Колонки: date, muscle_group, exercise, weight, reps "
+    "(или дата, группа мышц, упражнение, вес, повторения), разделитель ; или ,\n"
+    "Повторения: 10 или (12, 10, 8). Все подходы из файла сохраняются на ваше имя."
+)
+
+def add_imported(parts):
+    """Добавляет импортированные подходы (WorkoutColumns) в историю в памяти."""
+    global columns
+    for part in parts:
+        if columns is not None:
+            columns = columns.concat(part)
+        # Пользователи, которых еще нет в индексе, получат подходы при первом обращении
+        for user_name in loaded_users & set(part.categorical["user_id"].categories):
+            index.add_rows(part.rows(user_name))
+
+@handler_seconds.timed(handler="import_help")
+async def import_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Объясняет, как загрузить историю из файла."""
+    await update.message.reply_text(IMPORT_HELP)
+
+@handler_seconds.timed(handler="import_document")
+async def import_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Импортирует историю из присланного CSV-файла."""
+    user_id = str(update.message.from_user.id)
+
+    if user_id not in user_names:
+        await update.message.reply_text("Сначала представьтесь: /start")
+        return
+
+    document = update.message.document
+    if document.file_size and document.file_size > IMPORT_MAX_MB * 1024 * 1024:
+        await update.message.reply_text(f"Файл больше {IMPORT_MAX_MB} МБ, его не получится загрузить.")
+        return
+    if import_lock.locked():
+        await update.message.reply_text("Сейчас идет другой импорт, попробуйте через пару минут.")
+        return
+
+    user_name = user_names[user_id]
+    async with import_lock:
+        await update.message.reply_text("Загружаю историю...")
+        parts = []
+        try:
+            with tempfile.TemporaryDirectory(dir=".", prefix=".upload-") as directory:
+                path = os.path.join(directory, "upload.csv")
+                file = await context.bot.get_file(document.file_id)
+                await file.download_to_drive(path)
+                # Разбор и запись идут в отдельном потоке, не блокируя других пользователей
+                report = await asyncio.to_thread(
+                    bulk_import.import_file, path, workouts, {}, user=user_name,
+                    on_rows=lambda rows: parts.append(WorkoutColumns.from_frame(rows)))
+        except Exception as e:
+            logger.error(f"Ошибка при импорте истории {user_name}: {e}")
+            await update.message.reply_text(f"Не удалось импортировать файл: {e}")
+            return
+        add_imported(parts)
+
+    if report.imported:
+        publisher.publish([], None, workouts.cursor())
+    text = f"Импортировано подходов: {report.imported}, пропущено строк: {report.rejected}."
+    if report.errors:
+        text += "\n" + "\n".join(report.errors)
+    await update.message.reply_text(text)
+
+async def compaction_loop() -> None:
+    """Периодически переносит журнал в основное хранилище в фоновом потоке.
+
+    Первая компакция — через COMPACTION_INTERVAL после запуска: компакция
+    сразу при старте делала бы устаревшими снимки бота и дашборда. После
+    компакции снимок бота сохраняется заново, чтобы он пережил аварийную
+    остановку.
+    """
+    while True:
+        await asyncio.sleep(COMPACTION_INTERVAL)
+        try:
+            await asyncio.to_thread(workouts.compact)
+        except Exception as e:
+            logger.error(f"Ошибка при компакции журнала: {e}")
+        try:
+            await save_snapshot_running()
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении снимка: {e}")
+
+def start_chart_pool():
+    """Запускает процессы для графиков; вызывается до запуска фоновых потоков."""
+    global chart_pool
+    if chart_pool is None:
+        # fork, а не spawn: при spawn каждый процесс заново импортирует main.py
+        # и загружает всю историю
+        chart_pool = ProcessPoolExecutor(CHART_WORKERS, mp_context=multiprocessing.get_context("fork"))
+        chart_pool.submit(progress_chart.warm_up)
+
+def stop_chart_pool():
+    global chart_pool
+    if chart_pool is not None:
+        chart_pool.shutdown(wait=False, cancel_futures=True)
+        chart_pool = None
+
+async def backup_loop() -> None:
+    """Периодически сохраняет изменившиеся данные в git в фоновом потоке."""
+    data_backup = backup.Backup(lambda: workouts.backup_files() + [USER_NAMES_FILE], BACKUP_REMOTE)
+    while True:
+        try:
+            await asyncio.to_thread(data_backup.run)
+        except Exception as e:
+            logger.error(f"Ошибка при резервном копировании: {e}")
+        await asyncio.sleep(BACKUP_INTERVAL)
+
+async def post_init(application: Application) -> None:
+    """Запуск фоновых задач после инициализации бота."""
+    global metrics_server, telegram_bot
+    telegram_bot = application.bot
+    start_chart_pool()
+    if METRICS_PORT and metrics_server is None:
+        try:
+            metrics_server = metrics.serve(METRICS_PORT, METRICS_HOST)
+        except OSError as e:
+            logger.error(f"Метрики недоступны: {e}")
+    writer.start()
+    application.create_task(compaction_loop())
+    if BACKUP_REMOTE:
+        application.create_task(backup_loop())
+
+async def post_shutdown(application: Application) -> None:
+    """Дописываем очередь писателя перед остановкой бота и сохраняем снимок."""
+    stop_chart_pool()
+    await writer.stop()
+    try:
+        await asyncio.to_thread(save_snapshot)
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении снимка: {e}")
+
+def build_application(token, concurrent_updates=CONCURRENT_UPDATES, base_url=None) -> Application:
+    """Приложение бота со всеми обработчиками.
+
+    Обновления разных пользователей обрабатываются параллельно, одного
+    пользователя — по очереди. Индекс и имена меняются без await между
+    чтением и записью, а на диск все уходит через единственного фонового
+    писателя, поэтому дополнительных блокировок на данные не нужно.
+    """
+    builder = Application.builder().token(token).post_init(post_init).post_shutdown(post_shutdown)
+    if concurrent_updates > 1:
+        # Ответы отправляются параллельно, на каждый нужно свое соединение
+        builder = (builder.concurrent_updates(PerUserUpdateProcessor(concurrent_updates))
+                   .connection_pool_size(concurrent_updates))
+    if base_url is not None:
+        builder = builder.base_url(base_url)
+    application = builder.build()
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
@@ -381,8 +790,42 @@ def main() -> None:
 
     application.add_handler(conv_handler)
     application.add_handler(CommandHandler("delete_last", delete_last))
-    
-    application.run_polling()
+    application.add_handler(CommandHandler("progress", progress))
+    application.add_handler(CommandHandler("import", import_help))
+    application.add_handler(MessageHandler(filters.Document.FileExtension("csv"), import_document))
+    return application
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Telegram-бот для записи тренировок")
+    # manager.sh ищет процесс бота по этому аргументу
+    parser.add_argument("--bot", default="gym", help="имя экземпляра бота")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+def main() -> None:
+    """Запуск бота."""
+    profiling.configure(parse_args())
+    try:
+        # Пока бот работает, bulk_import.py не пишет в хранилище в обход него
+        bot_lock = bulk_import.lock_bot()
+    except BlockingIOError:
+        logger.error("Бот уже запущен в этом каталоге")
+        raise SystemExit(1)
+    token = load_token()
+    application = build_application(token)
+
+    if WEBHOOK_URL:
+        # Секрет в заголовке отличает запросы Telegram от посторонних
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=urlparse(WEBHOOK_URL).path.lstrip("/"),
+            webhook_url=WEBHOOK_URL,
+            secret_token=secrets.token_hex(32),
+            max_connections=CONCURRENT_UPDATES,
+        )
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""Метрики бота и дашборда в текстовом формате Prometheus.
+
+Небольшая реализация без зависимостей: счетчики, гистограммы задержек и
+сборщики, которые читают значения в момент запроса (например, попадания
+в кэш). Дашборд отдает метрики по адресу /metrics своего Flask-сервера,
+бот — отдельным HTTP-сервером (serve).
+"""
+import contextlib
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Границы корзин гистограмм задержек, секунды
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Набор метрик и сборщиков, которые выводятся вместе."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() возвращает [(имя, тип, описание, [(labels, значение), ...]), ...]."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        families = {}
+        for name, kind, description, samples in ([m.collect() for m in metrics] +
+                                                 [family for collect in collectors for family in collect()]):
+            family = families.setdefault(name, (kind, description, []))
+            family[2].extend(samples)
+        lines = []
+        for name, (kind, description, samples) in families.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    """Монотонный счетчик с метками."""
+
+    def __init__(self, name, description, registry=REGISTRY):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            samples = [(self.name, key, value) for key, value in self._values.items()]
+        return self.name, "counter", self.description, samples
+
+
+class Histogram:
+    """Гистограмма значений (обычно длительностей в секундах) с метками."""
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        # метки -> [счетчики по корзинам (последняя — +Inf), сумма, количество]
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][position] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Замеряет длительность блока with."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Декоратор, замеряющий длительность вызовов обычной или async-функции."""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - start, **labels)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def collect(self):
+        samples = []
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return self.name, "histogram", self.description, samples
+
+
+def register_cache(name, cache, registry=REGISTRY):
+    """Попадания, промахи и размер VersionedLRUCache под меткой cache=name."""
+    labels = (("cache", name),)
+
+    def collect():
+        stats = cache.stats()
+        return [
+            ("gym_cache_hits_total", "counter", "Попадания в кэш", [("gym_cache_hits_total", labels, stats["hits"])]),
+            ("gym_cache_misses_total", "counter", "Промахи кэша", [("gym_cache_misses_total", labels, stats["misses"])]),
+            ("gym_cache_entries", "gauge", "Записей в кэше", [("gym_cache_entries", labels, stats["size"])]),
+        ]
+
+    registry.add_collector(collect)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        data = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1", registry=REGISTRY):
+    """Отдает метрики по адресу http://host:port/metrics из фонового потока."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,134 @@
+"""Профилирование медленных обработчиков и callback'ов по запросу.
+
+Включается переменной окружения GYM_PROFILE=1 или флагом --profile у
+main.py и dashboard.py. Вызовы функций, помеченных profiled, выполняются
+под cProfile. Профиль вызова дольше порога (миллисекунды,
+GYM_PROFILE_THRESHOLD или --profile-threshold) сохраняется в каталог в формате
+pstats: python -m pstats, snakeviz, flameprof, gprof2dot. В режиме окна
+профили всех вызовов за окно складываются в один файл. Выключенное
+профилирование стоит одной проверки флага на вызов.
+
+Одновременно профилируется только один вызов: вложенные и параллельные
+вызовы выполняются как обычно. Профиль async-обработчика включает и
+работу других задач, которую цикл событий выполнил во время его await.
+"""
+import cProfile
+import functools
+import inspect
+import itertools
+import logging
+import os
+import pstats
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("GYM_PROFILE", "") not in ("", "0")
+# Порог сохранения профиля одного вызова, миллисекунды (как у --profile-threshold)
+THRESHOLD_MS = float(os.environ.get("GYM_PROFILE_THRESHOLD", "100"))
+DIRECTORY = os.environ.get("GYM_PROFILE_DIR", "profiles")
+# Длина окна в секундах; 0 — профиль на каждый медленный вызов
+WINDOW = float(os.environ.get("GYM_PROFILE_WINDOW", "0"))
+
+_busy = threading.Lock()
+_counter = itertools.count()
+_window_lock = threading.Lock()
+# имя -> [pstats.Stats, начало окна, количество вызовов]
+_windows = {}
+
+
+def add_arguments(parser):
+    """Флаги профилирования для argparse."""
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="профилировать медленные вызовы (GYM_PROFILE)")
+    parser.add_argument("--profile-threshold", type=float, metavar="MS",
+                        help=f"сохранять профили вызовов дольше MS миллисекунд (по умолчанию {THRESHOLD_MS:g}, GYM_PROFILE_THRESHOLD)")
+    parser.add_argument("--profile-dir", metavar="DIR", help=f"каталог профилей (по умолчанию {DIRECTORY})")
+    parser.add_argument("--profile-window", type=float, metavar="SEC",
+                        help="складывать профили всех вызовов за SEC секунд в один файл")
+
+
+def configure(args):
+    """Применяет флаги из add_arguments поверх переменных окружения."""
+    global ENABLED, THRESHOLD_MS, DIRECTORY, WINDOW
+    if args.profile:
+        ENABLED = True
+    if args.profile_threshold is not None:
+        THRESHOLD_MS = args.profile_threshold
+    if args.profile_dir is not None:
+        DIRECTORY = args.profile_dir
+    if args.profile_window is not None:
+        WINDOW = args.profile_window
+    if ENABLED:
+        mode = f"окно {WINDOW:g} с" if WINDOW else f"порог {THRESHOLD_MS:g} мс"
+        logger.info(f"Профилирование включено: {mode}, каталог {DIRECTORY}")
+
+
+def _path(name, suffix):
+    os.makedirs(DIRECTORY, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(DIRECTORY, f"{name}-{stamp}-{os.getpid()}-{next(_counter)}-{suffix}.prof")
+
+
+def _add_to_window(name, profile):
+    now = time.monotonic()
+    with _window_lock:
+        window = _windows.get(name)
+        if window is None:
+            window = _windows[name] = [pstats.Stats(profile), now, 1]
+        else:
+            window[0].add(profile)
+            window[2] += 1
+        if now - window[1] < WINDOW:
+            return
+        del _windows[name]
+    stats, _, calls = window
+    stats.dump_stats(_path(name, f"{calls}calls"))
+
+
+def _finish(name, profile, elapsed):
+    try:
+        if WINDOW:
+            _add_to_window(name, profile)
+        elif elapsed * 1000 >= THRESHOLD_MS:
+            path = _path(name, f"{elapsed * 1000:.0f}ms")
+            profile.dump_stats(path)
+            logger.info(f"{name}: {elapsed * 1000:.0f} мс, профиль сохранен в {path}")
+    except Exception as e:
+        logger.error(f"Профиль {name} не сохранен: {e}")
+
+
+def profiled(name):
+    """Декоратор: профилировать вызовы функции, когда профилирование включено."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not ENABLED or not _busy.acquire(blocking=False):
+                    return await func(*args, **kwargs)
+                profile = cProfile.Profile()
+                start = time.perf_counter()
+                profile.enable()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    _busy.release()
+                    _finish(name, profile, time.perf_counter() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not ENABLED or not _busy.acquire(blocking=False):
+                    return func(*args, **kwargs)
+                profile = cProfile.Profile()
+                start = time.perf_counter()
+                profile.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    _busy.release()
+                    _finish(name, profile, time.perf_counter() - start)
+        return wrapper
+    return decorator
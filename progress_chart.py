@@ -0,0 +1,60 @@
+"""График прогресса в упражнении для отправки в чат.
+
+Тот же ряд, что и на основном графике дашборда: вес по датам, цвет точки —
+максимум повторений в подходе, длинная история прореживается LTTB.
+Функция render вызывается в отдельном процессе (см. main.chart_pool),
+поэтому принимает и возвращает только простые значения.
+"""
+import io
+
+import numpy as np
+
+from downsample import lttb
+
+# Столько же точек, сколько показывает дашборд
+MAX_POINTS = 2000
+
+
+def warm_up():
+    """Импортирует matplotlib заранее, чтобы первый график строился быстро."""
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure  # noqa: F401
+
+
+def render(exercise, dates, weights, max_reps):
+    """PNG с графиком веса по датам; dates — строки YYYY-MM-DD."""
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    x = np.asarray(dates, dtype="datetime64[D]")
+    y = np.asarray(weights, dtype=np.float64)
+    colors = np.asarray(max_reps, dtype=np.float64)
+    order = np.argsort(x, kind="stable")
+    x, y, colors = x[order], y[order], colors[order]
+    if len(x) > MAX_POINTS:
+        keep = lttb(x.astype(np.int64), y, MAX_POINTS)
+        x, y, colors = x[keep], y[keep], colors[keep]
+
+    # Если все значения одинаковые, немного расширяем диапазон
+    vmin, vmax = colors.min(), colors.max()
+    if vmin == vmax:
+        vmin, vmax = max(0, vmin - 1), vmax + 1
+
+    fig = Figure(figsize=(8, 4.5), dpi=120)
+    ax = fig.add_subplot()
+    ax.plot(x, y, color=(150 / 255, 150 / 255, 150 / 255, 0.5), linewidth=1, zorder=1)
+    points = ax.scatter(x, y, c=colors, cmap="RdYlGn", vmin=vmin, vmax=vmax, s=40,
+                        edgecolors="darkslategrey", linewidths=1, alpha=0.8, zorder=2)
+    fig.colorbar(points, ax=ax, label="Макс. повторений", shrink=0.5)
+    ax.set_title(f"Прогресс в упражнении {exercise}")
+    ax.set_xlabel("Дата")
+    ax.set_ylabel("Вес (кг)")
+    ax.set_facecolor((240 / 255, 240 / 255, 240 / 255, 0.8))
+    ax.grid(color="white")
+    fig.autofmt_xdate()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
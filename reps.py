@@ -0,0 +1,115 @@
+"""Векторный разбор колонки reps.
+
+В файлах встречаются и голые числа ("9"), и строки с tuple ("(12, 10, 8)"),
+а из Arrow приходят массивы. Все это разбирается целиком в плоский массив
+повторений и смещения строк, по которым без цикла по строкам считаются
+максимум, сумма, число подходов и объем.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _parse_strings(strings):
+    """Разбирает строки с повторениями в плоский массив и количество на строку."""
+    cleaned = strings.str.replace(r"[()\[\]\s]", "", regex=True).str.strip(",")
+    lengths = cleaned.str.len().to_numpy()
+    counts = np.where(lengths > 0, cleaned.str.count(",").to_numpy() + 1, 0).astype(np.int64)
+    joined = ",".join(cleaned[lengths > 0])
+    values = np.fromstring(joined, dtype=np.int64, sep=",") if joined else np.empty(0, np.int64)
+    if len(values) != counts.sum():
+        raise ValueError("Некорректные значения в колонке reps")
+    return values, counts
+
+
+def normalize(strings):
+    """Строки с повторениями в виде tuple ('9' -> '(9,)') и маска корректных строк."""
+    # Пробелы разделяют повторения так же, как запятые: '9 8' -> '9,8'
+    cleaned = (pd.Series(strings, dtype=object).astype(str)
+               .str.replace(r"[()\[\]]", " ", regex=True).str.strip()
+               .str.replace(r"\s*,\s*|\s+", ",", regex=True).str.strip(",")
+               .str.replace(r"(?<!\d)0+(?=\d)", "", regex=True))
+    valid = cleaned.str.fullmatch(r"\d+(,\d+)*").to_numpy(dtype=bool)
+    single = ~cleaned.str.contains(",", regex=False).to_numpy(dtype=bool)
+    normalized = np.where(single, "(" + cleaned + ",)", "(" + cleaned.str.replace(",", ", ", regex=False) + ")")
+    return pd.Series(normalized, index=cleaned.index), valid
+
+
+def _parse_arrays(arrays):
+    """Разбирает массивы повторений (из Arrow) в плоский массив и количество на строку."""
+    counts = np.fromiter(map(len, arrays), dtype=np.int64, count=len(arrays))
+    if not counts.sum():
+        return np.empty(0, np.int64), counts
+    return np.concatenate([np.asarray(a, dtype=np.int64) for a in arrays if len(a)]), counts
+
+
+def parse(column):
+    """Колонка reps -> (values, offsets).
+
+    Повторения строки i — values[offsets[i]:offsets[i + 1]].
+    """
+    column = pd.Series(column).reset_index(drop=True)
+    if column.dtype == object:
+        is_str = column.map(type).to_numpy() == str
+    else:
+        is_str = np.ones(len(column), dtype=bool)
+
+    if is_str.all():
+        values, counts = _parse_strings(column.astype(str))
+    elif not is_str.any():
+        values, counts = _parse_arrays(column.to_numpy())
+    else:
+        # Массивы из основного файла вперемешку со строками из журнала
+        str_values, str_counts = _parse_strings(column[is_str].astype(str))
+        arr_values, arr_counts = _parse_arrays(column[~is_str].to_numpy())
+        counts = np.empty(len(column), dtype=np.int64)
+        counts[is_str] = str_counts
+        counts[~is_str] = arr_counts
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        values = np.empty(offsets[-1], dtype=np.int64)
+        for mask, part_values, part_counts in ((is_str, str_values, str_counts),
+                                               (~is_str, arr_values, arr_counts)):
+            starts = offsets[:-1][mask]
+            part_offsets = np.concatenate([[0], np.cumsum(part_counts)])[:-1]
+            positions = np.arange(len(part_values)) - np.repeat(part_offsets, part_counts)
+            values[np.repeat(starts, part_counts) + positions] = part_values
+        return values, offsets
+
+    return values, np.concatenate([[0], np.cumsum(counts)])
+
+
+def summarize(values, offsets, weight=None):
+    """Максимум, сумма и число подходов по строкам; объем, если передан вес."""
+    sets = np.diff(offsets)
+    # Нулевой элемент в конце делает reduceat корректным для пустых строк
+    padded = np.append(values, 0)
+    starts = offsets[:-1]
+    max_reps = np.maximum.reduceat(padded, starts) if len(starts) else np.empty(0, np.int64)
+    total_reps = np.add.reduceat(padded, starts) if len(starts) else np.empty(0, np.int64)
+    max_reps[sets == 0] = 0
+    total_reps[sets == 0] = 0
+    result = {"max_reps": max_reps, "total_reps": total_reps, "sets": sets}
+    if weight is not None:
+        result["volume"] = np.asarray(weight, dtype=np.float64) * total_reps
+    return result
+
+
+def to_padded(values, offsets, fill=0):
+    """Повторения в виде двумерного массива, дополненного значением fill."""
+    sets = np.diff(offsets)
+    padded = np.full((len(sets), sets.max(initial=0)), fill, dtype=values.dtype)
+    rows = np.repeat(np.arange(len(sets)), sets)
+    cols = np.arange(len(values)) - np.repeat(offsets[:-1], sets)
+    padded[rows, cols] = values
+    return padded
+
+
+def to_tuples(values, offsets):
+    """Повторения в виде списка tuple по строкам."""
+    flat = values.tolist()
+    bounds = offsets.tolist()
+    return [tuple(flat[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def to_strings(values, offsets):
+    """Повторения в виде строк с tuple по строкам: '(9,)', '(12, 10)'."""
+    return [str(reps) for reps in to_tuples(values, offsets)]
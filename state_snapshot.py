@@ -0,0 +1,90 @@
+"""Снимки разобранного состояния для быстрого перезапуска.
+
+Бот и дашборд сохраняют свое состояние вместе с курсором хранилища, на
+котором оно снято. При запуске снимок загружается, а из хранилища
+дочитываются только строки после курсора (read_since). Если хранилище
+с тех пор переписано (компакция, ручная правка файла), снимок не
+используется и данные загружаются полностью.
+
+Формат файла: MAGIC, длина заголовка, заголовок (pickle) и выровненные
+по ALIGN байтам массивы. Структура состояния сериализуется pickle
+протокола 5, а данные numpy-массивов (вес, повторения, коды категорий,
+блоки DataFrame) пишутся отдельно от нее как есть. При загрузке файл
+отображается в память (mmap, копирование при записи), и массивы
+ссылаются прямо на страницы файла: ничего не копируется и не разбирается,
+а с диска читаются только те страницы, к которым обращаются.
+"""
+import logging
+import mmap
+import os
+import pickle
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Меняется при несовместимом изменении содержимого снимков
+FORMAT = 3
+MAGIC = b"GYMSNAP\x00"
+ALIGN = 64
+_LENGTH = struct.Struct("<Q")
+
+
+def _padding(position):
+    return -position % ALIGN
+
+
+def save(path, storage, cursor, state):
+    """Атомарно сохраняет состояние, снятое на курсоре cursor хранилища storage."""
+    buffers = []
+    data = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    layout, position = [], 0
+    raws = [buffer.raw() for buffer in buffers]
+    for raw in raws:
+        layout.append((position, raw.nbytes))
+        position += raw.nbytes + _padding(raw.nbytes)
+    header = pickle.dumps({"format": FORMAT, "storage": storage.name, "cursor": cursor,
+                           "buffers": layout, "state": data}, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + _LENGTH.pack(len(header)) + header)
+        f.write(b"\x00" * _padding(f.tell()))
+        for raw in raws:
+            f.write(raw)
+            f.write(b"\x00" * _padding(raw.nbytes))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read(path):
+    """(заголовок, данные состояния) с массивами, отображенными из файла."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("неизвестный формат")
+        header = pickle.loads(f.read(_LENGTH.unpack(f.read(_LENGTH.size))[0]))
+        if header.get("format") != FORMAT:
+            return header, None
+        start = f.tell() + _padding(f.tell())
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)) if header["buffers"] else None
+    buffers = [view[start + offset:start + offset + length] for offset, length in header["buffers"]]
+    return header, pickle.loads(header["state"], buffers=buffers)
+
+
+def load(path, storage):
+    """(состояние, строки после снимка, текущий курсор) или None, если снимка нет или он устарел."""
+    try:
+        header, state = _read(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Снимок {path} не прочитан: {e}")
+        return None
+    if header.get("format") != FORMAT or header.get("storage") != storage.name:
+        return None
+    tail = storage.read_since(header["cursor"])
+    if tail is None:
+        logger.info(f"Снимок {path} устарел, данные загружаются полностью")
+        return None
+    new_rows, cursor = tail
+    return state, new_rows, cursor
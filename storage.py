@@ -0,0 +1,658 @@
+"""Хранилища тренировок для бота и дашборда.
+
+Бэкенд выбирается переменной окружения GYM_STORAGE:
+    csv    — workouts.csv с журналом дозаписи (по умолчанию)
+    sqlite — workouts.db в режиме WAL
+    arrow  — workouts.feather (Arrow IPC) с журналом дозаписи, нужен pyarrow
+    sharded — отдельный csv с журналом на каждого пользователя в workouts/
+
+Перенос данных между бэкендами (в том числе обратно в csv для git):
+    python storage.py migrate csv sqlite
+    python storage.py migrate arrow csv
+    python storage.py migrate csv sharded
+"""
+import abc
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+import journal
+import reps
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = journal.COLUMNS
+SQLITE_FILE = "workouts.db"
+ARROW_FILE = "workouts.feather"
+ARROW_JOURNAL_FILE = "workouts.feather.journal"
+SHARDS_DIR = "workouts"
+MANIFEST_FILE = "manifest.json"
+
+
+def parse_reps(value):
+    """Повторения одной записи из любого представления ('(12, 10)', '9', список) в tuple."""
+    if isinstance(value, str):
+        values, _ = reps.parse([value])
+        return tuple(values.tolist())
+    if isinstance(value, (int, float)):
+        return (int(value),)
+    return tuple(int(rep) for rep in value)
+
+
+def normalize_reps(value):
+    """Приводит повторения одной записи к строке с tuple: '9' -> '(9,)'."""
+    return str(parse_reps(value))
+
+
+def parse_reps_column(column):
+    """Колонка повторений в любом представлении -> (values, offsets) из reps.parse."""
+    column = pd.Series(column)
+    if column.dtype == object:
+        # Голые числа в колонке вперемешку со строками и списками
+        column = column.map(lambda x: (int(x),) if isinstance(x, (int, float)) else x)
+    return reps.parse(column)
+
+
+def reps_strings(column):
+    """Колонка повторений в строки с tuple одним векторным разбором."""
+    return reps.to_strings(*parse_reps_column(column))
+
+
+class JournaledStorage(abc.ABC):
+    """Основной файл с журналом дозаписи поверх него.
+
+    Подклассы задают формат основного файла через _read_base и _write_base.
+    """
+
+    name = None
+    # Данные всех пользователей читаются одним файлом
+    per_user = False
+
+    def __init__(self, base_path, journal_path):
+        self.base_path = base_path
+        self.journal_path = journal_path
+
+    @staticmethod
+    @abc.abstractmethod
+    def _read_base(path):
+        """DataFrame основного файла (колонки COLUMNS)."""
+
+    @staticmethod
+    @abc.abstractmethod
+    def _write_base(df, path):
+        """Записывает DataFrame в основной файл."""
+
+    def _read_base_tail(self, cursor):
+        """Строки, дописанные в конец основного файла, или None, если файл переписан."""
+        return None
+
+    def _base_cursor(self):
+        try:
+            st = os.stat(self.base_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def load(self):
+        """Все тренировки с учетом журнала."""
+        return self.load_with_cursor()[0]
+
+    def load_user(self, user_id):
+        """Тренировки одного пользователя."""
+        df = self.load()
+        return df[df["user_id"] == user_id].reset_index(drop=True)
+
+    def load_with_cursor(self):
+        """Все тренировки и курсор для последующего read_since."""
+        base_cursor = self._base_cursor()
+        records, offset, inode = journal.read_tail(self.journal_path, self.base_path)
+        df = journal.replay(self._read_base(self.base_path), records)
+        df["weight"] = pd.to_numeric(df["weight"])
+        return df, {"base": base_cursor, "journal": (inode, offset)}
+
+    def cursor(self):
+        """Курсор текущего состояния без чтения данных (как у load_with_cursor)."""
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return {"base": self._base_cursor(), "journal": (None, 0)}
+        return {"base": self._base_cursor(), "journal": (st.st_ino, st.st_size)}
+
+    def follow(self, cursor, before, after):
+        """Курсор после чужой записи между курсорами before и after или None, если cursor отстал."""
+        return after if cursor == before else None
+
+    def read_since(self, cursor):
+        """Строки, добавленные после курсора, и новый курсор.
+
+        Возвращает None, если нужна полная перезагрузка: основной файл
+        переписан или в хвосте журнала есть удаления.
+        """
+        base_cursor = self._base_cursor()
+        if base_cursor != cursor["base"]:
+            tail = self._read_base_tail(cursor["base"])
+            if tail is None:
+                return None
+            # Журнал относился к прежней версии основного файла
+            new_rows, base_cursor = tail
+            records, offset, inode = journal.read_tail(self.journal_path, self.base_path)
+            if inode is not None and offset:
+                return None
+            return new_rows, {"base": base_cursor, "journal": (inode, offset)}
+
+        inode, offset = cursor["journal"]
+        records, new_offset, new_inode = journal.read_tail(self.journal_path, self.base_path, offset)
+        if new_inode != inode and inode is not None:
+            return None
+        if new_offset < offset or any(op != journal.OP_ADD for op, *row in records):
+            return None
+        return journal.to_frame(records), {"base": base_cursor, "journal": (new_inode, new_offset)}
+
+    def write(self, records):
+        """Сохраняет записи [(op, row), ...] в журнал."""
+        journal.write(records, self.journal_path, self.base_path)
+
+    def write_frames(self, frames):
+        """Дописывает подходы из DataFrame'ов (reps — строки tuple) одной записью в журнал."""
+        return journal.write_frames(frames, self.journal_path, self.base_path)
+
+    def compact(self):
+        """Переносит журнал в основной файл."""
+        journal.compact(self.base_path, self.journal_path, self._read_base, self._write_base)
+
+    def stamp(self):
+        """Отпечаток состояния данных для проверки изменений."""
+        return journal.stamp(self.base_path, self.journal_path)
+
+    def backup_files(self):
+        """Файлы с данными для резервной копии."""
+        return [self.base_path, self.journal_path]
+
+    def replace_all(self, df):
+        """Заменяет все данные содержимым DataFrame."""
+        tmp = self.base_path + ".tmp"
+        self._write_base(df, tmp)
+        os.replace(tmp, self.base_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+
+class CsvStorage(JournaledStorage):
+    """workouts.csv с журналом дозаписи поверх него."""
+
+    name = "csv"
+    # Сколько байт в начале файла проверяется, чтобы заметить перезапись
+    HEAD_SIZE = 4096
+
+    def __init__(self, base_path=journal.WORKOUTS_FILE, journal_path=journal.JOURNAL_FILE):
+        super().__init__(base_path, journal_path)
+
+    @staticmethod
+    def _read_base(path):
+        return journal._read_base(path)
+
+    @staticmethod
+    def _write_base(df, path):
+        # Строки из файла и журнала пишутся как есть, чтобы не раздувать diff в git
+        column = df["reps"].reset_index(drop=True)
+        is_str = (column.map(type) == str).to_numpy()
+        if not is_str.all():
+            column = column.astype(object)
+            column[~is_str] = reps_strings(column[~is_str])
+        df[COLUMNS].assign(reps=column.to_numpy()).to_csv(path, sep=';', index=False)
+
+    def _head_hash(self, size):
+        with open(self.base_path, "rb") as f:
+            return hashlib.sha1(f.read(min(size, self.HEAD_SIZE))).hexdigest()
+
+    def _base_cursor(self):
+        cursor = super()._base_cursor()
+        if cursor is None:
+            return None
+        return cursor + (self._head_hash(cursor[1]),)
+
+    def _read_base_tail(self, cursor):
+        new_cursor = self._base_cursor()
+        # Файл только дописан: тот же inode, размер вырос, начало не изменилось
+        if (cursor is None or new_cursor is None or new_cursor[0] != cursor[0]
+                or new_cursor[1] < cursor[1] or self._head_hash(cursor[1]) != cursor[3]):
+            return None
+        with open(self.base_path, "rb") as f:
+            f.seek(cursor[1])
+            data = f.read(new_cursor[1] - cursor[1])
+        if not data.endswith(b"\n"):
+            return None
+        new_rows = pd.read_csv(io.BytesIO(data), sep=';', header=None, names=COLUMNS,
+                               dtype=str, keep_default_na=False)
+        new_rows["weight"] = pd.to_numeric(new_rows["weight"])
+        return new_rows, new_cursor
+
+
+class SqliteStorage:
+    """SQLite в режиме WAL: бот вставляет строки, дашборд читает параллельно."""
+
+    name = "sqlite"
+    per_user = False
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS workouts (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            muscle_group TEXT NOT NULL,
+            exercise TEXT NOT NULL,
+            weight REAL NOT NULL,
+            reps TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS workouts_lookup
+            ON workouts (user_id, muscle_group, exercise, date);
+        -- Счетчик удалений: по нему дашборд понимает, что нужна полная перезагрузка
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('deletes', 0);
+    """
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        # Одно соединение на процесс; обращения из разных потоков сериализуются
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def load(self):
+        """Все тренировки в порядке сохранения; reps остаются строками."""
+        return self.load_with_cursor()[0]
+
+    def load_user(self, user_id):
+        """Тренировки одного пользователя (по индексу)."""
+        with self._lock, self._conn:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNS)} FROM workouts WHERE user_id = ? ORDER BY id",
+                self._conn, params=(user_id,)
+            )
+
+    def _cursor(self):
+        last_id = self._conn.execute("SELECT coalesce(max(id), 0) FROM workouts").fetchone()[0]
+        deletes = self._conn.execute("SELECT value FROM meta WHERE key = 'deletes'").fetchone()[0]
+        return last_id, deletes
+
+    def load_with_cursor(self):
+        """Все тренировки и курсор для последующего read_since."""
+        with self._lock, self._conn:
+            last_id, deletes = self._cursor()
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNS)} FROM workouts WHERE id <= ? ORDER BY id",
+                self._conn, params=(last_id,)
+            )
+        return df, (last_id, deletes)
+
+    def cursor(self):
+        """Курсор текущего состояния без чтения данных."""
+        with self._lock:
+            return self._cursor()
+
+    def follow(self, cursor, before, after):
+        """Курсор после чужой записи между курсорами before и after или None, если cursor отстал."""
+        return after if cursor == before else None
+
+    def read_since(self, cursor):
+        """Строки, добавленные после курсора, или None, если были удаления."""
+        with self._lock, self._conn:
+            last_id, deletes = self._cursor()
+            if deletes != cursor[1]:
+                return None
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNS)} FROM workouts WHERE id > ? AND id <= ? ORDER BY id",
+                self._conn, params=(cursor[0], last_id)
+            )
+        return df, (last_id, deletes)
+
+    def write(self, records):
+        """Сохраняет записи [(op, row), ...] одной транзакцией."""
+        with self._lock, self._conn:
+            for op, row in records:
+                values = (row["user_id"], row["date"], row["muscle_group"], row["exercise"])
+                if op == journal.OP_ADD:
+                    self._conn.execute(
+                        "INSERT INTO workouts (user_id, date, muscle_group, exercise, weight, reps) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        values + (float(row["weight"]), normalize_reps(row["reps"]))
+                    )
+                elif op == journal.OP_DELETE:
+                    self._conn.execute(
+                        "DELETE FROM workouts WHERE id = (SELECT max(id) FROM workouts "
+                        "WHERE user_id = ? AND muscle_group = ? AND exercise = ? AND date = ? AND weight = ?)",
+                        (row["user_id"], row["muscle_group"], row["exercise"], row["date"], float(row["weight"]))
+                    )
+                    self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'deletes'")
+
+    def write_frames(self, frames):
+        """Дописывает подходы из DataFrame'ов (reps — строки tuple) одной транзакцией."""
+        count = 0
+        with self._lock, self._conn:
+            for frame in frames:
+                self._conn.executemany(
+                    "INSERT INTO workouts (user_id, date, muscle_group, exercise, weight, reps) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    zip(frame["user_id"], frame["date"], frame["muscle_group"], frame["exercise"],
+                        frame["weight"].astype(float), frame["reps"])
+                )
+                count += len(frame)
+        return count
+
+    def compact(self):
+        """Переносит WAL в основной файл базы."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def stamp(self):
+        """Меняется после каждой транзакции другого соединения."""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def backup_files(self):
+        """Файлы с данными для резервной копии (WAL копируется вместе с базой)."""
+        return [self.path]
+
+    def replace_all(self, df):
+        """Заменяет все данные содержимым DataFrame."""
+        rows = zip(df["user_id"], df["date"], df["muscle_group"], df["exercise"],
+                   df["weight"].astype(float), reps_strings(df["reps"]))
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM workouts")
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'deletes'")
+            self._conn.executemany(
+                "INSERT INTO workouts (user_id, date, muscle_group, exercise, weight, reps) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+
+class ArrowStorage(JournaledStorage):
+    """Колоночный файл Arrow IPC (Feather v2) с журналом дозаписи поверх него.
+
+    reps хранится как list<int32>, user_id/muscle_group/exercise/date —
+    словарные колонки. Файл пишется без сжатия и читается через mmap.
+    """
+
+    name = "arrow"
+
+    def __init__(self, path=ARROW_FILE, journal_path=ARROW_JOURNAL_FILE):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Для хранилища arrow нужен пакет pyarrow") from None
+        super().__init__(path, journal_path)
+
+    @staticmethod
+    def _read_base(path):
+        from pyarrow import feather
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except FileNotFoundError:
+            return pd.DataFrame(columns=COLUMNS)
+        return table.to_pandas()
+
+    @staticmethod
+    def _write_base(df, path):
+        import pyarrow as pa
+        from pyarrow import feather
+        values, offsets = parse_reps_column(df["reps"])
+        table = pa.table({
+            "user_id": pa.array(df["user_id"].astype(str)).dictionary_encode(),
+            "date": pa.array(df["date"].astype(str)).dictionary_encode(),
+            "muscle_group": pa.array(df["muscle_group"].astype(str)).dictionary_encode(),
+            "exercise": pa.array(df["exercise"].astype(str)).dictionary_encode(),
+            "weight": pa.array(pd.to_numeric(df["weight"]), pa.float64()),
+            "reps": pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), pa.array(values, pa.int32())),
+        })
+        feather.write_feather(table, path, compression="uncompressed")
+
+
+class ShardedStorage:
+    """Отдельный csv с журналом на каждого пользователя.
+
+    workouts/manifest.json хранит соответствие пользователей и файлов.
+    Запись и чтение одного пользователя затрагивают только его файлы,
+    а в git меняются только файлы тех, кто тренировался. Курсор — словарь
+    {пользователь: курсор его файла}; read_since следит только за
+    пользователями из курсора.
+    """
+
+    name = "sharded"
+    per_user = True
+
+    def __init__(self, path=SHARDS_DIR):
+        self.path = path
+        self.manifest_path = os.path.join(path, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._manifest = {}
+        self._manifest_stamp = None
+        self._shards = {}
+
+    def _stamp_manifest(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _read_manifest(self):
+        """{пользователь: файл}; перечитывается, только если манифест изменился."""
+        stamp = self._stamp_manifest()
+        if stamp is None:
+            return {}
+        if stamp != self._manifest_stamp:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+            self._manifest_stamp = stamp
+        return self._manifest
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+
+    @staticmethod
+    def _file_name(user_id):
+        # Имя файла читаемое, а хэш не дает совпасть разным пользователям
+        slug = re.sub(r"[^\w-]+", "_", user_id).strip("_")[:40]
+        return f"{slug}-{hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:8]}.csv"
+
+    def users(self):
+        """Пользователи в порядке появления."""
+        return list(self._read_manifest())
+
+    def shard(self, user_id, create=False):
+        """Хранилище одного пользователя или None, если его еще нет."""
+        file_name = self._read_manifest().get(user_id)
+        if file_name is None:
+            if not create:
+                return None
+            with self._lock:
+                manifest = dict(self._read_manifest())
+                file_name = manifest.setdefault(user_id, self._file_name(user_id))
+                self._write_manifest(manifest)
+        shard = self._shards.get(user_id)
+        if shard is None:
+            path = os.path.join(self.path, file_name)
+            shard = self._shards.setdefault(user_id, CsvStorage(path, path + ".journal"))
+        return shard
+
+    def load(self):
+        """Все тренировки всех пользователей."""
+        return self.load_with_cursor()[0]
+
+    def load_user(self, user_id):
+        """Тренировки одного пользователя."""
+        return self.load_user_with_cursor(user_id)[0]
+
+    @staticmethod
+    def _empty():
+        df = pd.DataFrame(columns=COLUMNS)
+        df["weight"] = pd.to_numeric(df["weight"])
+        return df
+
+    def load_user_with_cursor(self, user_id):
+        """Тренировки одного пользователя и курсор его файла (None, если файла нет)."""
+        shard = self.shard(user_id)
+        if shard is None:
+            return self._empty(), None
+        return shard.load_with_cursor()
+
+    def load_with_cursor(self, users=None):
+        """Тренировки пользователей (по умолчанию всех) и курсор для read_since."""
+        users = self.users() if users is None else users
+        frames, cursor = [], {}
+        for user_id in users:
+            df, cursor[user_id] = self.load_user_with_cursor(user_id)
+            frames.append(df)
+        if not frames:
+            return self._empty(), cursor
+        return pd.concat(frames, ignore_index=True), cursor
+
+    def read_since(self, cursor):
+        """Строки, добавленные пользователям из курсора, или None, если нужна полная перезагрузка."""
+        frames, new_cursor = [], {}
+        for user_id, shard_cursor in cursor.items():
+            shard = self.shard(user_id)
+            if shard is None:
+                if shard_cursor is not None:
+                    return None
+                new_cursor[user_id] = None
+                continue
+            if shard_cursor is None:
+                # Файл пользователя появился после загрузки
+                df, new_cursor[user_id] = shard.load_with_cursor()
+            else:
+                tail = shard.read_since(shard_cursor)
+                if tail is None:
+                    return None
+                df, new_cursor[user_id] = tail
+            frames.append(df)
+        if not frames:
+            return self._empty(), new_cursor
+        return pd.concat(frames, ignore_index=True), new_cursor
+
+    def write(self, records):
+        """Сохраняет записи [(op, row), ...] в файлы их пользователей."""
+        by_user = {}
+        for op, row in records:
+            by_user.setdefault(row["user_id"], []).append((op, row))
+        for user_id, user_records in by_user.items():
+            self.shard(user_id, create=True).write(user_records)
+
+    def write_frames(self, frames):
+        """Дописывает подходы из DataFrame'ов в файлы их пользователей.
+
+        Каждый кусок пишется в журнал пользователя одной записью.
+        """
+        count = 0
+        for frame in frames:
+            for user_id, rows in frame.groupby("user_id", sort=False):
+                count += self.shard(user_id, create=True).write_frames([rows])
+        return count
+
+    def compact(self):
+        """Переносит журналы в основные файлы пользователей."""
+        for user_id in self.users():
+            self.shard(user_id).compact()
+
+    def stamp(self):
+        """Отпечаток манифеста и файлов всех пользователей."""
+        stamps = [self._stamp_manifest()]
+        stamps.extend(self.shard(user_id).stamp() for user_id in self.users())
+        return tuple(stamps)
+
+    def cursor(self):
+        """Курсоры файлов всех пользователей без чтения данных."""
+        return {user_id: self.shard(user_id).cursor() for user_id in self.users()}
+
+    def follow(self, cursor, before, after):
+        """Курсор после чужой записи между курсорами before и after или None, если cursor отстал.
+
+        Сравниваются только пользователи из cursor: записи остальных не нужны.
+        """
+        if any(before.get(user_id) != shard_cursor for user_id, shard_cursor in cursor.items()):
+            return None
+        return {user_id: after.get(user_id) for user_id in cursor}
+
+    def backup_files(self):
+        """Манифест и файлы всех пользователей для резервной копии."""
+        files = [self.manifest_path]
+        for user_id in self.users():
+            files.extend(self.shard(user_id).backup_files())
+        return files
+
+    def replace_all(self, df):
+        """Заменяет все данные содержимым DataFrame."""
+        manifest = {}
+        for user_id, rows in df.groupby("user_id", sort=False):
+            manifest[user_id] = self._file_name(user_id)
+            path = os.path.join(self.path, manifest[user_id])
+            os.makedirs(self.path, exist_ok=True)
+            CsvStorage(path, path + ".journal").replace_all(rows.reset_index(drop=True))
+        # Файлы пользователей, которых больше нет в данных
+        for user_id, file_name in self._read_manifest().items():
+            if user_id not in manifest:
+                for path in (file_name, file_name + ".journal"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(self.path, path))
+        with self._lock:
+            self._write_manifest(manifest)
+            self._shards = {}
+
+
+BACKENDS = {
+    CsvStorage.name: CsvStorage,
+    SqliteStorage.name: SqliteStorage,
+    ArrowStorage.name: ArrowStorage,
+    ShardedStorage.name: ShardedStorage,
+}
+
+
+def get_storage(name=None):
+    """Создает хранилище по имени или по переменной окружения GYM_STORAGE."""
+    name = name or os.environ.get("GYM_STORAGE", CsvStorage.name)
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Неизвестное хранилище: {name}") from None
+
+
+def migrate(source, target):
+    """Переносит все тренировки из одного хранилища в другое."""
+    df = get_storage(source).load()
+    get_storage(target).replace_all(df)
+    logger.info(f"Перенесено {len(df)} записей: {source} -> {target}")
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилища тренировок")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="перенести данные между хранилищами")
+    migrate_parser.add_argument("source", choices=BACKENDS)
+    migrate_parser.add_argument("target", choices=BACKENDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    if args.command == "migrate":
+        migrate(args.source, args.target)
+
+
+if __name__ == "__main__":
+    main()
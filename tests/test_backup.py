@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKUP = os.path.join(ROOT, "backup.py")
+
+
+def run_backup(cwd, *args):
+    subprocess.run([sys.executable, BACKUP, *args], cwd=cwd, check=True,
+                   env=dict(os.environ, GYM_STORAGE="csv", PYTHONPATH=ROOT))
+
+
+def git(git_dir, *args):
+    return subprocess.run(["git", "--git-dir", git_dir, *args], check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def write_data(directory, rows):
+    # Больше CHUNK_SIZE, чтобы основной файл хранился частями
+    with open(os.path.join(directory, "workouts.csv"), "w", encoding="utf-8") as f:
+        f.write("user_id;date;muscle_group;exercise;weight;reps\n")
+        for i in range(rows):
+            f.write(f"Иван;2026-01-{i % 28 + 1:02d};Грудь;Жим лежа {i % 7};{50 + i % 40}.5;({i % 12 + 1}, 8)\n")
+    with open(os.path.join(directory, "user_names.json"), "w", encoding="utf-8") as f:
+        f.write('{"1": "Иван"}')
+
+
+def read_files(directory, names):
+    result = {}
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            result[name] = f.read()
+    return result
+
+
+def test_backup_to_bare_remote_and_restore(tmp_path):
+    data, restored, remote = tmp_path / "data", tmp_path / "restored", str(tmp_path / "remote.git")
+    data.mkdir()
+    subprocess.run(["git", "init", "--quiet", "--bare", remote], check=True)
+    write_data(data, 40_000)
+    run_backup(data, "--remote", remote)
+
+    # Вторая копия: дописанный журнал и измененный конец основного файла
+    with open(data / "workouts.journal", "w", encoding="utf-8") as f:
+        f.write("#base;0;0\n+;Иван;2026-02-01;Грудь;Жим лежа 1;60.0;(10,)\n")
+    with open(data / "workouts.csv", "a", encoding="utf-8") as f:
+        f.write("Иван;2026-02-02;Спина;Тяга;70.0;(8,)\n")
+    run_backup(data, "--remote", remote)
+
+    for git_dir in (remote, str(data / "backup.git")):
+        git(git_dir, "fsck", "--strict", "--no-dangling")
+    assert len(git(remote, "rev-list", "gym-data").stdout.split()) == 2
+
+    run_backup(tmp_path, "--remote", remote, "--git-dir", str(tmp_path / "restore.git"),
+               "restore", str(restored))
+    names = ["workouts.csv", "workouts.journal", "user_names.json"]
+    assert read_files(restored, names) == read_files(data, names)
@@ -0,0 +1,58 @@
+import asyncio
+
+import journal
+from writer import BackgroundWriter
+
+ROW = {"user_id": "Иван", "date": "2026-01-01", "muscle_group": "Грудь",
+       "exercise": "Жим лежа", "weight": 60.0, "reps": (10, 8)}
+
+
+def run_writer(write_records, records, **kwargs):
+    """Пропускает записи через писателя и возвращает потерянные."""
+    lost = []
+
+    async def on_lost(records):
+        lost.extend(records)
+
+    async def main():
+        writer = BackgroundWriter(write_records, lambda names: None, on_lost=on_lost,
+                                  flush_interval=0.01, retry_delay=0.01, **kwargs)
+        writer.start()
+        for record in records:
+            writer.submit(record)
+        await writer.stop()
+
+    asyncio.run(main())
+    return lost
+
+
+def test_failed_batch_is_retried(tmp_path):
+    base_path, journal_path = tmp_path / "workouts.csv", tmp_path / "workouts.journal"
+    calls = []
+
+    def write_records(records):
+        calls.append(len(records))
+        if len(calls) == 1:
+            raise OSError("диск недоступен")
+        journal.write(records, journal_path, base_path)
+
+    lost = run_writer(write_records, [(journal.OP_ADD, ROW)])
+
+    assert lost == []
+    assert len(calls) == 2
+    records = journal.read(journal_path, base_path)
+    assert [rec[:5] for rec in records] == [["+", "Иван", "2026-01-01", "Грудь", "Жим лежа"]]
+
+
+def test_records_are_reported_after_max_attempts():
+    calls = []
+
+    def write_records(records):
+        calls.append(len(records))
+        raise OSError("диск недоступен")
+
+    record = (journal.OP_ADD, ROW)
+    lost = run_writer(write_records, [record], max_attempts=3)
+
+    assert lost == [record]
+    assert calls == [1, 1, 1]
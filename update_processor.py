@@ -0,0 +1,48 @@
+import asyncio
+
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка обновлений разных пользователей.
+
+    Обновления одного пользователя обрабатываются строго по очереди в порядке
+    поступления: состояние диалога и изменения его данных не гоняются друг с
+    другом. Обновления разных пользователей обрабатываются одновременно, не
+    больше max_concurrent_updates. Очередь пользователя ждет своей
+    блокировки, не занимая место в общем лимите.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # user_id -> [блокировка, сколько обновлений ее ждут или держат]
+        self._locks = {}
+
+    @staticmethod
+    def _key(update):
+        user = getattr(update, "effective_user", None)
+        return user.id if user is not None else None
+
+    async def process_update(self, update, coroutine):
+        key = self._key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import compact
+import reps
+from analytics import epley_1rm
+
+# Виды рекордов в упражнении
+TOP_WEIGHT = "top_weight"
+REPS_AT_WEIGHT = "reps_at_weight"
+E1RM = "e1rm"
+SESSION_VOLUME = "session_volume"
+
+
+class RunningRecords:
+    """Лучшие результаты в упражнении, обновляемые по одному подходу.
+
+    add запоминает прежние значения всего, что изменил, поэтому последний
+    подход откатывается (undo) за O(1), без пересчета по истории.
+    """
+
+    __slots__ = ("top_weight", "best_e1rm", "best_volume", "best_volume_date",
+                 "reps_at_weight", "session_volume", "_undo")
+
+    def __init__(self):
+        self.top_weight = None
+        self.best_e1rm = None
+        self.best_volume = None
+        self.best_volume_date = None
+        # {вес: наибольшее число повторений в подходе с этим весом}
+        self.reps_at_weight = {}
+        # {дата: объем тренировки в упражнении}
+        self.session_volume = {}
+        self._undo = []
+
+    def add(self, date, weight, reps):
+        """Учитывает подход и возвращает побитые им рекорды [(вид, значение, прежнее значение)].
+
+        Первый результат в упражнении (или с новым весом) рекордом не считается.
+        """
+        max_reps = max(reps, default=0)
+        e1rm = epley_1rm(weight, max_reps)
+        previous_reps = self.reps_at_weight.get(weight)
+        previous_session = self.session_volume.get(date)
+        session = (previous_session or 0.0) + weight * sum(reps)
+        self._undo.append((self.top_weight, self.best_e1rm, self.best_volume, self.best_volume_date,
+                           weight, previous_reps, date, previous_session))
+
+        broken = []
+        if self.top_weight is None or weight > self.top_weight:
+            if self.top_weight is not None:
+                broken.append((TOP_WEIGHT, weight, self.top_weight))
+            self.top_weight = weight
+        if previous_reps is None or max_reps > previous_reps:
+            if previous_reps is not None:
+                broken.append((REPS_AT_WEIGHT, max_reps, previous_reps))
+            self.reps_at_weight[weight] = max_reps
+        if e1rm > 0 and (self.best_e1rm is None or e1rm > self.best_e1rm):
+            if self.best_e1rm is not None:
+                broken.append((E1RM, e1rm, self.best_e1rm))
+            self.best_e1rm = e1rm
+        self.session_volume[date] = session
+        if self.best_volume is None or session > self.best_volume:
+            # О рекорде объема сообщаем один раз за тренировку, а не на каждом подходе
+            if self.best_volume is not None and self.best_volume_date != date:
+                broken.append((SESSION_VOLUME, session, self.best_volume))
+            self.best_volume, self.best_volume_date = session, date
+        return broken
+
+    def undo(self):
+        """Откатывает последний add."""
+        (self.top_weight, self.best_e1rm, self.best_volume, self.best_volume_date,
+         weight, previous_reps, date, previous_session) = self._undo.pop()
+        if previous_reps is None:
+            del self.reps_at_weight[weight]
+        else:
+            self.reps_at_weight[weight] = previous_reps
+        if previous_session is None:
+            del self.session_volume[date]
+        else:
+            self.session_volume[date] = previous_session
+
+
+class WorkoutIndex:
+    """Индекс тренировок: пользователь → группа мышц → упражнение → подходы.
+
+    Строится один раз при запуске и обновляется на месте при сохранении
+    и удалении подходов, поэтому поиск не зависит от размера истории.
+    Вместе с подходами обновляются рекорды в каждом упражнении.
+    """
+
+    def __init__(self):
+        # {user_id: {muscle_group: {exercise: [(date, weight, reps), ...]}}}
+        self.users = {}
+        # {user_id: [(muscle_group, exercise), ...]} в порядке сохранения
+        self.history = {}
+        # {(user_id, muscle_group, exercise): RunningRecords} для упражнений,
+        # в которых рекорды уже запрашивались
+        self._records = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Строит индекс по DataFrame с тренировками."""
+        index = cls()
+        index.add_frame(df)
+        return index
+
+    def add_frame(self, df):
+        """Добавляет в индекс все подходы из DataFrame."""
+        self.add_rows(zip(df["user_id"], df["date"], df["muscle_group"],
+                          df["exercise"], df["weight"], df["reps"]))
+
+    def add_rows(self, rows):
+        """Добавляет подходы (user_id, date, muscle_group, exercise, weight, reps)."""
+        for row in rows:
+            self._add(*row)
+
+    def _add(self, user_id, date, muscle_group, exercise, weight, reps):
+        sets = self.users.setdefault(user_id, {}).setdefault(muscle_group, {}).setdefault(exercise, [])
+        sets.append((date, weight, reps))
+        self.history.setdefault(user_id, []).append((muscle_group, exercise))
+        # Рекорды обновляются, только если их уже считали для этого упражнения
+        records = self._records.get((user_id, muscle_group, exercise))
+        return records.add(date, weight, reps) if records is not None else []
+
+    def add(self, row):
+        """Добавляет подход в индекс и возвращает побитые им рекорды (см. RunningRecords.add)."""
+        self.records(row["user_id"], row["muscle_group"], row["exercise"])
+        return self._add(row["user_id"], row["date"], row["muscle_group"],
+                         row["exercise"], row["weight"], row["reps"])
+
+    def muscle_groups(self, user_id):
+        """Группы мышц пользователя в порядке первого появления."""
+        return list(self.users.get(user_id, {}))
+
+    def exercises(self, user_id, muscle_group):
+        """Упражнения пользователя для группы мышц в порядке первого появления."""
+        return list(self.users.get(user_id, {}).get(muscle_group, {}))
+
+    def sets(self, user_id, muscle_group, exercise):
+        """Все подходы пользователя в упражнении."""
+        return self.users.get(user_id, {}).get(muscle_group, {}).get(exercise, [])
+
+    def records(self, user_id, muscle_group, exercise):
+        """Текущие рекорды пользователя в упражнении (RunningRecords).
+
+        При первом обращении считаются одним проходом по подходам упражнения,
+        дальше обновляются вместе с индексом.
+        """
+        key = (user_id, muscle_group, exercise)
+        records = self._records.get(key)
+        if records is None:
+            records = self._records[key] = RunningRecords()
+            for date, weight, reps in self.sets(user_id, muscle_group, exercise):
+                records.add(date, weight, reps)
+        return records
+
+    def last_set(self, user_id, muscle_group, exercise):
+        """Последний подход пользователя в упражнении или None."""
+        sets = self.sets(user_id, muscle_group, exercise)
+        if not sets:
+            return None
+        return self._row(user_id, muscle_group, exercise, sets[-1])
+
+    def last_entry(self, user_id):
+        """Последний сохраненный подход пользователя или None."""
+        history = self.history.get(user_id)
+        if not history:
+            return None
+        muscle_group, exercise = history[-1]
+        return self.last_set(user_id, muscle_group, exercise)
+
+    def delete_last(self, user_id):
+        """Удаляет последний подход пользователя и возвращает его."""
+        row = self.last_entry(user_id)
+        if row is None:
+            return None
+        muscle_group, exercise = self.history[user_id].pop()
+        groups = self.users[user_id]
+        groups[muscle_group][exercise].pop()
+        records = self._records.get((user_id, muscle_group, exercise))
+        if records is not None:
+            records.undo()
+        # Пустые упражнения и группы убираем, как если бы их не было в истории
+        if not groups[muscle_group][exercise]:
+            del groups[muscle_group][exercise]
+            self._records.pop((user_id, muscle_group, exercise), None)
+            if not groups[muscle_group]:
+                del groups[muscle_group]
+        return row
+
+    def rows(self, user_id):
+        """Подходы пользователя в порядке сохранения."""
+        positions = {}
+        for key in self.history.get(user_id, []):
+            position = positions.get(key, 0)
+            positions[key] = position + 1
+            muscle_group, exercise = key
+            yield self._row(user_id, muscle_group, exercise, self.users[user_id][muscle_group][exercise][position])
+
+    @staticmethod
+    def _row(user_id, muscle_group, exercise, entry):
+        date, weight, reps = entry
+        return {
+            "user_id": user_id,
+            "date": date,
+            "muscle_group": muscle_group,
+            "exercise": exercise,
+            "weight": weight,
+            "reps": reps,
+        }
+
+
+class WorkoutColumns:
+    """Тренировки в виде типизированных колонок.
+
+    Строковые колонки хранятся как pd.Categorical, вес — во float32,
+    повторения — плоским массивом со смещениями (см. reps.parse). Такие
+    колонки быстро сохраняются в снимок и загружаются из него, а подходы
+    пользователя переносятся в индекс только при первом обращении к нему.
+    """
+
+    CATEGORICAL = ["user_id", "date", "muscle_group", "exercise"]
+
+    def __init__(self, categorical, weight, reps_values, reps_offsets):
+        self.categorical = categorical
+        self.weight = weight
+        self.reps_values = reps_values
+        self.reps_offsets = reps_offsets
+
+    def __len__(self):
+        return len(self.weight)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Колонки из DataFrame хранилища (reps — строки, массивы или tuple)."""
+        values, offsets = reps.parse(df["reps"])
+        categorical = {name: pd.Categorical(df[name].astype(str)) for name in cls.CATEGORICAL}
+        return cls(categorical, compact.to_weight(df["weight"]), values, offsets)
+
+    def concat(self, other):
+        """Колонки с дописанными в конец строками other."""
+        categorical = {name: union_categoricals([self.categorical[name], other.categorical[name]])
+                       for name in self.CATEGORICAL}
+        offsets = np.concatenate([self.reps_offsets, other.reps_offsets[1:] + self.reps_offsets[-1]])
+        return WorkoutColumns(categorical, np.concatenate([self.weight, other.weight]),
+                              np.concatenate([self.reps_values, other.reps_values]), offsets)
+
+    def take(self, positions):
+        """Колонки только из строк с номерами positions."""
+        starts = self.reps_offsets[:-1][positions]
+        counts = np.diff(self.reps_offsets)[positions]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        # Номера повторений выбранных строк без цикла по строкам
+        flat = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+        categorical = {name: column[positions] for name, column in self.categorical.items()}
+        return WorkoutColumns(categorical, self.weight[positions], self.reps_values[flat], offsets)
+
+    def without_users(self, user_ids):
+        """Колонки без строк указанных пользователей."""
+        mask = ~np.asarray(self.categorical["user_id"].isin(list(user_ids)))
+        return self.take(np.flatnonzero(mask))
+
+    def rows(self, user_id):
+        """Подходы пользователя для WorkoutIndex.add_rows в порядке сохранения."""
+        users = self.categorical["user_id"]
+        if user_id not in users.categories:
+            return []
+        part = self.take(np.flatnonzero(users.codes == users.categories.get_loc(user_id)))
+        columns = [np.asarray(part.categorical[name]).tolist() for name in self.CATEGORICAL]
+        return zip(*columns, compact.from_weight(part.weight).tolist(),
+                   reps.to_tuples(part.reps_values, part.reps_offsets))
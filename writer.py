@@ -0,0 +1,163 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Группа записей сбрасывается на диск не реже, чем раз в FLUSH_INTERVAL
+# секунд, или сразу, как только набралось MAX_BATCH записей
+FLUSH_INTERVAL = 0.05
+MAX_BATCH = 100
+# Несохраненная пачка повторяется с паузой RETRY_DELAY, 2 * RETRY_DELAY, ...
+# и после MAX_ATTEMPTS неудачных попыток передается в on_lost
+RETRY_DELAY = 0.5
+MAX_ATTEMPTS = 5
+
+
+class BackgroundWriter:
+    """Фоновая запись на диск с групповым сохранением.
+
+    Обработчики только ставят изменения в очередь и сразу продолжают работу.
+    Задача-писатель собирает очередь в пачки и сохраняет каждую пачку
+    в отдельном потоке одним вызовом write_records (одна синхронизация
+    с диском), не блокируя цикл событий бота.
+
+    Если пачку сохранить не удалось, она повторяется вместе с новыми
+    записями; записи, которые так и не удалось сохранить, передаются
+    корутине on_lost(records).
+    """
+
+    def __init__(self, write_records, write_user_names, on_lost=None,
+                 flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH,
+                 retry_delay=RETRY_DELAY, max_attempts=MAX_ATTEMPTS):
+        self._write_records = write_records
+        self._write_user_names = write_user_names
+        self._on_lost = on_lost
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._queue = asyncio.Queue()
+        self._task = None
+        # Поставленные в очередь, но еще не сохраненные (или не потерянные) записи
+        self._unfinished = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def start(self):
+        """Запускает задачу-писатель в текущем цикле событий."""
+        self._task = asyncio.create_task(self._run())
+
+    def _put(self, item):
+        self._unfinished += 1
+        self._idle.clear()
+        self._queue.put_nowait(item)
+
+    def _done(self, count):
+        self._unfinished -= count
+        if not self._unfinished:
+            self._idle.set()
+
+    def submit(self, record):
+        """Ставит в очередь запись журнала (op, row)."""
+        self._put(("record", record))
+
+    def submit_user_names(self, user_names):
+        """Ставит в очередь сохранение копии имен пользователей."""
+        self._put(("user_names", dict(user_names)))
+
+    async def wait_idle(self):
+        """Ждет, пока все поставленное в очередь будет сохранено.
+
+        После возврата и до следующего await в очереди ничего нет.
+        """
+        while self._unfinished:
+            await self._idle.wait()
+
+    async def stop(self):
+        """Дописывает все, что осталось в очереди, и останавливает писателя."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def _collect(self):
+        """Ждет первую запись и добирает остальные до заполнения пачки или таймаута."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.flush_interval
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Уже накопившееся в очереди забираем без ожидания
+        while batch[-1] is not None and len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _drain(self):
+        """Все, что уже есть в очереди, без ожидания."""
+        batch = []
+        while not self._queue.empty() and (not batch or batch[-1] is not None):
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _flush(self, batch):
+        """Сохраняет пачку и возвращает ее элементы, которые сохранить не удалось."""
+        records = [payload for kind, payload in batch if kind == "record"]
+        # Из нескольких версий имен достаточно сохранить последнюю
+        user_names = [payload for kind, payload in batch if kind == "user_names"]
+        failed = []
+        try:
+            if records:
+                self._write_records(records)
+        except Exception as e:
+            logger.error(f"Ошибка при записи журнала ({len(records)} записей): {e}")
+            failed.extend(item for item in batch if item[0] == "record")
+        try:
+            if user_names:
+                self._write_user_names(user_names[-1])
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении имен пользователей: {e}")
+            failed.append(next(item for item in reversed(batch) if item[0] == "user_names"))
+        return failed
+
+    async def _run(self):
+        pending, attempts, stopping = [], 0, False
+        while True:
+            if attempts:
+                # Прошлая пачка не сохранена: новые записи копятся в очереди до повтора
+                await asyncio.sleep(self.retry_delay * 2 ** (attempts - 1))
+                batch = self._drain()
+            elif stopping:
+                return
+            else:
+                batch = await self._collect()
+            stopping = stopping or (bool(batch) and batch[-1] is None)
+            # Несохраненные записи идут первыми, чтобы порядок в журнале не менялся
+            pending.extend(item for item in batch if item is not None)
+            if not pending:
+                continue
+            failed = await asyncio.to_thread(self._flush, pending)
+            if not failed:
+                self._done(len(pending))
+                pending, attempts = [], 0
+                continue
+            attempts += 1
+            if attempts < self.max_attempts:
+                self._done(len(pending) - len(failed))
+                pending = failed
+                continue
+            lost = [payload for kind, payload in failed if kind == "record"]
+            logger.error(f"Записи не сохранены после {attempts} попыток и потеряны: {len(lost)}")
+            if lost and self._on_lost is not None:
+                try:
+                    await self._on_lost(lost)
+                except Exception as e:
+                    logger.error(f"Ошибка при обработке потерянных записей: {e}")
+            self._done(len(pending))
+            pending, attempts = [], 0